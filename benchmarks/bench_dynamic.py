@@ -0,0 +1,70 @@
+"""
+Benchmark of the dynamic coloring.
+
+Applies random edge insertions and deletions to random regular graphs
+through ``brocs.dynamic.DynamicColoring`` and compares the time of an edit
+with coloring the edited graph again from scratch. Checks that the
+maintained coloring stays proper.
+
+Usage:
+    python benchmarks/bench_dynamic.py [--edits N] [--seed S]
+"""
+
+import argparse
+import random
+import time
+
+import networkx as nx
+
+from brocs.algorithms import LinearBrooksAlgorithm
+from brocs.csr import CSRGraph
+from brocs.dynamic import DynamicColoring
+from brocs.evaluation import coloring_statistics
+
+SIZES = (1_000, 10_000, 100_000)
+DEGREE = 4
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--edits", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(
+        f"{'vertices':>9} {'edits':>7} {'per edit [us]':>14} "
+        f"{'recolor [ms]':>13} {'colors':>7}"
+    )
+    for n in SIZES:
+        graph = nx.random_regular_graph(DEGREE, n, seed=args.seed)
+        csr = CSRGraph.from_networkx(graph)
+        dynamic = DynamicColoring(csr, LinearBrooksAlgorithm(random_state=args.seed))
+
+        inserted = []
+        start = time.perf_counter()
+        for _ in range(args.edits):
+            if inserted and rng.random() < 0.3:
+                dynamic.remove_edge(*inserted.pop(rng.randrange(len(inserted))))
+                continue
+            u, v = rng.randrange(n), rng.randrange(n)
+            if u != v and not dynamic.has_edge(u, v):
+                dynamic.add_edge(u, v)
+                inserted.append((u, v))
+        per_edit = (time.perf_counter() - start) / args.edits
+
+        edited = dynamic.to_csr()
+        statistics = coloring_statistics(edited.edges(), dynamic.coloring())
+        assert statistics.is_coloring_correct, f"Coloring of {n} vertices broke"
+
+        start = time.perf_counter()
+        LinearBrooksAlgorithm(random_state=args.seed).color_graph(edited)
+        recolor = time.perf_counter() - start
+        print(
+            f"{n:>9} {args.edits:>7} {per_edit * 1e6:>14.2f} "
+            f"{recolor * 1e3:>13.2f} {dynamic.number_of_colors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
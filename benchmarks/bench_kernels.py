@@ -0,0 +1,125 @@
+"""
+Benchmark of the shared greedy coloring kernel.
+
+Compares the connected sequential coloring done the old way (locking
+``queue.Queue`` with duplicate neighbors, list scan for the smallest free
+color) with ``brocs.algorithms.kernels``, on the graphs in graph_files and
+on larger random graphs, and with its compiled numba backend when Numba is
+installed. All produce the same coloring.
+
+Usage:
+    python benchmarks/bench_kernels.py [graph_dir] [--repeat N]
+"""
+
+import argparse
+import time
+from pathlib import Path
+from queue import Queue
+from typing import Callable, List
+
+import networkx as nx
+
+from brocs.algorithms.kernels import connected_sequential, empty_colors, numba
+from brocs.csr import CSRGraph
+from brocs.loader import load_csr, load_npy_mmap
+
+GRAPH_FILES = Path(__file__).parent.parent / "graph_files"
+
+
+def queue_connected_sequential(csr: CSRGraph, root: int) -> List[int]:
+    """Connected sequential coloring as it was done before the kernel."""
+    indptr, indices = csr.indptr, csr.indices
+    colors = [-1] * csr.number_of_nodes()
+    q = Queue()
+    q.put(root)
+    while not q.empty():
+        v = q.get()
+        if colors[v] == -1:
+            forbidden_colors = []
+            for neighbor in indices[indptr[v] : indptr[v + 1]].tolist():
+                if colors[neighbor] == -1:
+                    q.put(neighbor)
+                else:
+                    forbidden_colors.append(colors[neighbor])
+            color = 0
+            while color in forbidden_colors:
+                color += 1
+            colors[v] = color
+    return colors
+
+
+def kernel_connected_sequential(csr: CSRGraph, root: int) -> List[int]:
+    colors = [-1] * csr.number_of_nodes()
+    connected_sequential(csr, root, colors)
+    return colors
+
+
+def numba_connected_sequential(csr: CSRGraph, root: int) -> List[int]:
+    colors = empty_colors(csr.number_of_nodes(), "numba")
+    connected_sequential(csr, root, colors, backend="numba")
+    return colors.tolist()
+
+
+def best_time(function: Callable[[], List[int]], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def load_graphs(directory: Path) -> dict[str, CSRGraph]:
+    graphs = {}
+    for file in sorted(directory.glob("*.npy")):
+        graphs[file.stem], _ = load_npy_mmap(file)
+    for file in sorted(directory.glob("*.npz")):
+        graphs[file.stem], _ = load_csr(file)
+    graphs["regular_3_100k"] = CSRGraph.from_networkx(
+        nx.random_regular_graph(3, 100_000, seed=0)
+    )
+    graphs["gnm_20k_1m"] = CSRGraph.from_networkx(
+        nx.gnm_random_graph(20_000, 1_000_000, seed=0)
+    )
+    return graphs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("graph_dir", nargs="?", default=GRAPH_FILES, type=Path)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    header = (
+        f"{'graph':<20} {'vertices':>9} {'edges':>9} "
+        f"{'queue [ms]':>11} {'kernel [ms]':>12} {'speedup':>8}"
+    )
+    if numba is not None:
+        header += f" {'numba [ms]':>11} {'speedup':>8}"
+    print(header)
+    for name, csr in load_graphs(args.graph_dir).items():
+        if not csr.number_of_nodes():
+            continue
+        old = queue_connected_sequential(csr, 0)
+        new = kernel_connected_sequential(csr, 0)
+        assert old == new, f"Colorings of {name} differ"
+
+        old_time = best_time(lambda: queue_connected_sequential(csr, 0), args.repeat)
+        new_time = best_time(lambda: kernel_connected_sequential(csr, 0), args.repeat)
+        row = (
+            f"{name:<20} {csr.number_of_nodes():>9} {csr.number_of_edges():>9} "
+            f"{old_time * 1e3:>11.3f} {new_time * 1e3:>12.3f} "
+            f"{old_time / new_time:>7.1f}x"
+        )
+        if numba is not None:
+            compiled = numba_connected_sequential(csr, 0)
+            assert compiled == new, f"Numba coloring of {name} differs"
+            numba_time = best_time(
+                lambda: numba_connected_sequential(csr, 0), args.repeat
+            )
+            row += f" {numba_time * 1e3:>11.3f} {old_time / numba_time:>7.1f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
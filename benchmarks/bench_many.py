@@ -0,0 +1,63 @@
+"""
+Benchmark of coloring many small graphs at once.
+
+Colors every graph of the networkx graph atlas (all graphs with up to
+7 vertices) one by one with ``evaluate_graph`` and packed together with
+``evaluate_many``, and checks that both give the same colorings.
+
+Usage:
+    python benchmarks/bench_many.py [--repeat N] [--backend auto]
+"""
+
+import argparse
+import time
+
+import networkx as nx
+import numpy as np
+
+from brocs.algorithms import ConnectedSequential, LinearBrooksAlgorithm
+from brocs.algorithms.kernels import BACKENDS
+from brocs.csr import PackedGraphs
+from brocs.evaluation import evaluate_graph, evaluate_many
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    args = parser.parse_args()
+
+    graphs = nx.graph_atlas_g()
+    packed = PackedGraphs.pack(graphs)
+    print(f"{len(graphs)} graphs, {packed.graph.number_of_nodes()} vertices")
+    print(
+        f"{'algorithm':<24} {'one by one [ms]':>16} {'packed [ms]':>12} "
+        f"{'speedup':>8}"
+    )
+    for algorithm_class in (ConnectedSequential, LinearBrooksAlgorithm):
+        algorithm = algorithm_class(random_state=0, backend=args.backend)
+        batch = evaluate_many(packed, algorithm)
+        for i, G in enumerate(graphs):
+            single = evaluate_graph(G, algorithm).coloring
+            assert np.array_equal(batch.coloring_of(i), single), f"Graph {i} differs"
+
+        single_times, packed_times = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for G in graphs:
+                evaluate_graph(G, algorithm)
+            single_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            evaluate_many(graphs, algorithm)
+            packed_times.append(time.perf_counter() - start)
+
+        single_time, packed_time = min(single_times), min(packed_times)
+        print(
+            f"{algorithm.name:<24} {single_time * 1e3:>16.1f} "
+            f"{packed_time * 1e3:>12.1f} {single_time / packed_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
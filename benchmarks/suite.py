@@ -0,0 +1,494 @@
+"""
+Benchmark suite of brocs.
+
+Times the graph helpers (``delta``, ``dist_two``, ``validate_coloring``),
+the coloring algorithms and the graph loaders separately, on the graph
+families of ``brocs.graphs``, the random and dense random sweep of
+``graph_files/generate.py`` and large synthetic graphs. All graphs are
+generated from fixed seeds, so every run measures the same instances.
+
+Every measurement is warmed up, then repeated. Fast operations are called
+several times per repetition, so a repetition lasts at least --min-time.
+Results are written as JSON together with the machine, package versions
+and git commit, and two result files can be compared.
+
+Usage:
+    python benchmarks/suite.py [--out results.json] [--quick] [--only NAME]
+    python benchmarks/suite.py compare old.json new.json
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional
+
+import networkx as nx
+import numpy as np
+
+from brocs import __version__, graphs
+from brocs.algorithms import (
+    BrooksAlgorithm,
+    ConnectedSequential,
+    LinearBrooksAlgorithm,
+)
+from brocs.algorithms.kernels import BACKENDS, resolve_backend
+from brocs.csr import CSRGraph
+from brocs.helpers import delta, dist_two, validate_coloring
+from brocs.loader import (
+    load_csr,
+    load_dimacs,
+    load_edge_list,
+    load_npy_mmap,
+    save_csr,
+)
+from brocs.timing import TimingSettings, time_calls
+
+RESULTS_FORMAT = "brocs-benchmarks"
+RESULTS_FORMAT_VERSION = 1
+
+FAMILIES = (
+    "fish",
+    "path",
+    "fence",
+    "bipartite",
+    "erdos_renyi",
+    "cavemen",
+    "diamond",
+    "twin_kite",
+    "double_twin_kite",
+    "domek",
+    "lopata",
+)
+
+# grid of graph_files/generate.py
+SWEEP_NODES = (10, 20, 50, 100, 200, 500)
+SWEEP_EDGES = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# dense .npy files are only written for graphs up to this size
+MAX_DENSE_NODES = 5_000
+
+# dist_two squares the adjacency matrix, sum of squared degrees bounds its work
+MAX_DIST_TWO_WORK = 50_000_000
+
+# the reference Brooks algorithm runs networkx queries, large graphs are skipped
+MAX_REFERENCE_NODES = 1_000
+
+
+@dataclass
+class Instance:
+    group: str
+    name: str
+    csr: CSRGraph
+
+    @property
+    def vertices(self) -> int:
+        return self.csr.number_of_nodes()
+
+    @property
+    def edges(self) -> int:
+        return self.csr.number_of_edges()
+
+
+@dataclass
+class Benchmark:
+    """Operation timed on every instance it applies to.
+
+    Attributes:
+        prepare: Called once per instance, before any timing, returns what
+            ``setup`` needs (files written, a coloring to validate).
+        setup: Called before every timed call, outside of the timing,
+            returns the argument of ``run``.
+        run: The timed operation.
+    """
+
+    name: str
+    prepare: Callable[[Instance, Path], Any]
+    setup: Callable[[Any], Any]
+    run: Callable[[Any], Any]
+    applies: Callable[[Instance], bool] = lambda instance: True
+
+
+def family_instances() -> Iterator[Instance]:
+    for name in FAMILIES:
+        G = getattr(graphs, name)()
+        yield Instance("families", name, CSRGraph.from_networkx(G))
+
+
+def sweep_instances(seed: int) -> Iterator[Instance]:
+    """Connected graphs of the generate.py sweep, one random and one dense
+    random graph for every size, drawn with the same generators.
+    """
+    for n_nodes in SWEEP_NODES:
+        for n_edges in SWEEP_EDGES:
+            if n_edges > n_nodes * (n_nodes - 1) / 2:
+                continue
+            for kind, generator in (
+                ("random", graphs.random_gen),
+                ("dense_random", graphs.dense_random_gen),
+            ):
+                # the generators use the global random module
+                random.seed(f"{seed}-{kind}-{n_nodes}-{n_edges}")
+                for _ in range(20):
+                    G = generator(n_nodes, n_edges)
+                    if nx.is_connected(G):
+                        name = f"{kind}_{n_nodes}_{n_edges}"
+                        yield Instance("sweep", name, CSRGraph.from_networkx(G))
+                        break
+
+
+def large_instances(seed: int) -> Iterator[Instance]:
+    yield Instance(
+        "large",
+        "regular_3_100k",
+        CSRGraph.from_networkx(nx.random_regular_graph(3, 100_000, seed=seed)),
+    )
+    yield Instance(
+        "large",
+        "gnm_20k_1m",
+        CSRGraph.from_networkx(nx.gnm_random_graph(20_000, 1_000_000, seed=seed)),
+    )
+    path = np.arange(200_000)
+    yield Instance(
+        "large", "path_200k", CSRGraph.from_edges(len(path), path[:-1], path[1:])
+    )
+
+
+def fresh_copy(csr: CSRGraph) -> CSRGraph:
+    """Graph sharing the arrays of csr, without its cached invariants."""
+    return CSRGraph(csr.indptr, csr.indices)
+
+
+def write_dimacs(file: Path, csr: CSRGraph) -> None:
+    edges = csr.edges() + 1
+    with open(file, "w") as f:
+        f.write(f"p edge {csr.number_of_nodes()} {len(edges)}\n")
+        np.savetxt(f, edges, fmt="e %d %d")
+
+
+def write_edge_list(file: Path, csr: CSRGraph) -> None:
+    np.savetxt(file, csr.edges(), fmt="%d %d")
+
+
+def write_npy(file: Path, csr: CSRGraph) -> None:
+    np.save(file, csr.to_scipy().toarray().astype(np.int8))
+
+
+def loader_benchmark(
+    name: str,
+    suffix: str,
+    write: Callable[[Path, CSRGraph], None],
+    load: Callable[[Path], Any],
+    applies: Callable[[Instance], bool],
+) -> Benchmark:
+    def prepare(instance: Instance, directory: Path) -> Path:
+        file = directory / f"{instance.group}-{instance.name}{suffix}"
+        if not file.exists():
+            write(file, instance.csr)
+        return file
+
+    return Benchmark(name, prepare, setup=lambda file: file, run=load, applies=applies)
+
+
+def benchmarks(backend: str) -> List[Benchmark]:
+    def algorithm_benchmark(name, algorithm, applies=lambda instance: True):
+        return Benchmark(
+            name,
+            prepare=lambda instance, directory: instance.csr,
+            setup=fresh_copy,
+            run=algorithm.color_graph,
+            applies=applies,
+        )
+
+    def coloring(instance: Instance, directory: Path):
+        colors = ConnectedSequential(random_state=0, backend=backend).color_graph(
+            instance.csr
+        )
+        return instance.csr, colors
+
+    def dist_two_work(instance: Instance) -> int:
+        degrees = instance.csr.degrees.astype(np.int64)
+        return int((degrees * degrees).sum())
+
+    def loaders_apply(instance: Instance) -> bool:
+        return instance.group != "families" and instance.vertices >= 100
+
+    def dense_loaders_apply(instance: Instance) -> bool:
+        return loaders_apply(instance) and instance.vertices <= MAX_DENSE_NODES
+
+    return [
+        Benchmark(
+            "delta",
+            prepare=lambda instance, directory: instance.csr,
+            setup=lambda csr: csr,
+            run=delta,
+        ),
+        Benchmark(
+            "dist_two",
+            prepare=lambda instance, directory: instance.csr,
+            setup=lambda csr: csr,
+            run=dist_two,
+            applies=lambda instance: dist_two_work(instance) <= MAX_DIST_TWO_WORK,
+        ),
+        Benchmark(
+            "validate_coloring",
+            prepare=coloring,
+            setup=lambda prepared: prepared,
+            run=lambda prepared: validate_coloring(*prepared),
+        ),
+        algorithm_benchmark("cs", ConnectedSequential(random_state=0, backend=backend)),
+        algorithm_benchmark(
+            "brooks", LinearBrooksAlgorithm(random_state=0, backend=backend)
+        ),
+        algorithm_benchmark(
+            "brooks-reference",
+            BrooksAlgorithm(random_state=0, backend=backend),
+            applies=lambda instance: instance.vertices <= MAX_REFERENCE_NODES,
+        ),
+        loader_benchmark(
+            "load_npy",
+            ".npy",
+            write_npy,
+            lambda file: CSRGraph.from_numpy(np.load(file)),
+            dense_loaders_apply,
+        ),
+        loader_benchmark(
+            "load_npy_mmap",
+            ".npy",
+            write_npy,
+            lambda file: load_npy_mmap(file)[0],
+            dense_loaders_apply,
+        ),
+        loader_benchmark(
+            "load_csr",
+            ".npz",
+            lambda file, csr: save_csr(file, csr),
+            load_csr,
+            loaders_apply,
+        ),
+        loader_benchmark(
+            "load_dimacs", ".col", write_dimacs, load_dimacs, loaders_apply
+        ),
+        loader_benchmark(
+            "load_edge_list", ".edges", write_edge_list, load_edge_list, loaders_apply
+        ),
+    ]
+
+
+def measure(
+    benchmark: Benchmark,
+    prepared: Any,
+    warmup: int,
+    repeat: int,
+    min_time_ns: int,
+) -> dict[str, Any]:
+    """Times ``benchmark.run`` with ``time_calls``, every call getting its
+    own ``benchmark.setup`` result. The garbage collector is off while
+    calls are timed.
+    """
+    _, timing = time_calls(
+        benchmark.run,
+        TimingSettings(warmup=warmup, samples=repeat, min_sample_time=min_time_ns),
+        setup=lambda: benchmark.setup(prepared),
+    )
+    return {
+        "number": timing.loops,
+        "times_ns": [round(t) for t in timing.times],
+        "min_ns": round(timing.min),
+        "median_ns": round(timing.median),
+        "mean_ns": round(timing.mean),
+        "stdev_ns": round(timing.stdev),
+    }
+
+
+def package_version(name: str) -> Optional[str]:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def git_revision() -> dict[str, Any]:
+    root = Path(__file__).resolve().parent.parent
+
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args],
+                cwd=root,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+    }
+
+
+def machine_metadata() -> dict[str, Any]:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "brocs": __version__,
+        **git_revision(),
+        "packages": {
+            name: package_version(name)
+            for name in ("numpy", "scipy", "networkx", "pandas", "numba")
+        },
+    }
+
+
+def run_suite(args: argparse.Namespace) -> int:
+    backend = resolve_backend(args.backend)
+    instances = list(family_instances()) + list(sweep_instances(args.seed))
+    if not args.quick:
+        instances += list(large_instances(args.seed))
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="brocs-bench-") as directory:
+        for benchmark in benchmarks(backend):
+            if args.only and not any(
+                fnmatch.fnmatch(benchmark.name, pattern) for pattern in args.only
+            ):
+                continue
+            for instance in instances:
+                if not benchmark.applies(instance):
+                    continue
+                result = {
+                    "benchmark": benchmark.name,
+                    "group": instance.group,
+                    "instance": instance.name,
+                    "vertices": instance.vertices,
+                    "edges": instance.edges,
+                }
+                try:
+                    prepared = benchmark.prepare(instance, Path(directory))
+                    result.update(
+                        measure(
+                            benchmark,
+                            prepared,
+                            args.warmup,
+                            args.repeat,
+                            int(args.min_time * 1e9),
+                        )
+                    )
+                    summary = f"{result['median_ns'] / 1e6:12.3f} ms"
+                except Exception as error:
+                    result["error"] = repr(error)
+                    summary = f"  failed: {error!r}"
+                results.append(result)
+                print(f"{benchmark.name:<18} {instance.name:<24} {summary}", flush=True)
+
+    output = {
+        "format": RESULTS_FORMAT,
+        "version": RESULTS_FORMAT_VERSION,
+        "settings": {
+            "seed": args.seed,
+            "warmup": args.warmup,
+            "repeat": args.repeat,
+            "min_time": args.min_time,
+            "quick": args.quick,
+            "backend": backend,
+        },
+        "machine": machine_metadata(),
+        "results": sorted(
+            results, key=lambda r: (r["benchmark"], r["group"], r["instance"])
+        ),
+    }
+    out = Path(args.out)
+    out.write_text(json.dumps(output, indent=1) + "\n")
+    print(f"Wrote {len(results)} results to {out}")
+    return 0
+
+
+def compare(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="suite.py compare",
+        description="Compare median times of two result files",
+    )
+    parser.add_argument("old", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.1,
+        help="Ratio of medians reported as a change",
+    )
+    args = parser.parse_args(argv)
+
+    def medians(file: Path) -> dict[tuple[str, str], int]:
+        data = json.loads(file.read_text())
+        return {
+            (r["benchmark"], r["instance"]): r["median_ns"]
+            for r in data["results"]
+            if "median_ns" in r
+        }
+
+    old, new = medians(args.old), medians(args.new)
+    print(f"{'benchmark':<18} {'instance':<24} {'old [ms]':>12} {'new [ms]':>12} ratio")
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key] / old[key] if old[key] else float("inf")
+        flag = ""
+        if ratio >= args.threshold:
+            flag = "slower"
+        elif ratio <= 1 / args.threshold:
+            flag = "faster"
+        print(
+            f"{key[0]:<18} {key[1]:<24} {old[key] / 1e6:>12.3f} "
+            f"{new[key] / 1e6:>12.3f} {ratio:5.2f} {flag}"
+        )
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:<18} {key[1]:<24} only in {'old' if key in old else 'new'}")
+    return 0
+
+
+def main() -> int:
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        return compare(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--out", default="benchmark-results.json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.01,
+        help="Shortest repetition in seconds, fast calls are repeated within it",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Skip the large synthetic graphs",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        help="Run only benchmarks matching this pattern, like cs or load_*",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    return run_suite(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
 from brocs.algorithms.base import ColoringAlgorithm
 from brocs.algorithms.brooks import BrooksAlgorithm
 from brocs.algorithms.cs import ConnectedSequential
+from brocs.algorithms.linear_brooks import LinearBrooksAlgorithm
@@ -1,26 +1,88 @@
+import copy
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Iterable, Optional, Union
 
-from networkx import Graph
+import numpy as np
+
+from brocs.csr import GraphLike, PackedGraphs, as_packed
+from brocs.helpers import compact_coloring
 
 
 class ColoringAlgorithm(ABC):
     name: str
+    random_state: Optional[int] = None
+    jobs: int = 1
+    backend: str = "auto"
+
+    # settings deciding only how a coloring is computed, never which one
+    execution_settings = ("jobs", "backend")
 
     def __init__(self) -> None:
         self.name = self.__class__.__name__
         super().__init__()
 
     @abstractmethod
-    def color_graph(self, G: Graph) -> List[int]:
+    def color_graph(self, G: GraphLike) -> np.ndarray:
         """
         Creates a graph coloring.
 
         Args:
-            G: Graph structure loaded with networkx library
+            G: Graph structure loaded with networkx library, or its compact
+                ``CSRGraph`` form (a NumPy or SciPy adjacency matrix is
+                accepted as well). Vertex i is the i-th node of the graph.
 
         Returns:
-            List of colors (non-negative integers), representing good coloring
-            of the Graph G.
+            Array of colors (non-negative integers), representing good
+            coloring of the Graph G. Its dtype is the smallest one holding
+            all colors, see ``brocs.helpers.compact_coloring``.
         """
         pass
+
+    def color_many(
+        self, graphs: Union[PackedGraphs, Iterable[GraphLike]]
+    ) -> np.ndarray:
+        """
+        Colors many graphs, usually small ones, in one call. Every graph
+        gets the coloring ``color_graph`` would give it.
+
+        Args:
+            graphs: Graphs to color, or ``PackedGraphs`` holding them.
+
+        Returns:
+            Colors of all vertices of the packed graphs, graph i owns
+            ``colors[offsets[i]:offsets[i + 1]]``, see ``PackedGraphs.unpack``.
+        """
+        packed = as_packed(graphs)
+        colors = np.empty(packed.graph.number_of_nodes(), dtype=np.int64)
+        for i, (start, end) in enumerate(
+            zip(packed.offsets[:-1].tolist(), packed.offsets[1:].tolist())
+        ):
+            if start < end:
+                colors[start:end] = self.color_graph(packed[i])
+        return compact_coloring(colors)
+
+    def with_random_state(self, random_state: Optional[int]) -> "ColoringAlgorithm":
+        """
+        Returns:
+            Copy of the algorithm with the same settings, seeded with
+            random_state.
+        """
+        algorithm = copy.deepcopy(self)
+        algorithm.random_state = random_state
+        return algorithm
+
+    def parameters(self) -> dict[str, Any]:
+        """
+        Returns:
+            Settings of the algorithm other than its name, random_state and
+            execution settings, nested algorithms are described by their own
+            parameters.
+        """
+        parameters = {}
+        for key, value in sorted(vars(self).items()):
+            if key in ("name", "random_state") or key in self.execution_settings:
+                continue
+            if isinstance(value, ColoringAlgorithm):
+                value = {"name": value.name, **value.parameters()}
+            parameters[key] = value
+        return parameters
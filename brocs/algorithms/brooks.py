@@ -8,53 +8,111 @@ Brooks theorem algorithm
 """
 
 import logging
-from queue import LifoQueue, Queue
-from typing import List, Optional
+from collections import deque
+from typing import Optional
 import random
 
 import networkx as nx
+import numpy as np
+from networkx.algorithms.flow import edmonds_karp
 
 from brocs.algorithms.base import ColoringAlgorithm
 from brocs.algorithms.cs import ConnectedSequential
-from brocs.helpers import dist_two, dist_two_from, find_common_neighbor
+from brocs.algorithms.components import color_components, color_subgraphs
+from brocs.algorithms.kernels import (
+    connected_sequential,
+    empty_colors,
+    resolve_backend,
+)
+from brocs.budget import CancellationToken, current_token
+from brocs.csr import GraphLike
+from brocs.helpers import compact_coloring, dist_two_from, find_common_neighbor
+from brocs.instrumentation import current_recorder
+from brocs.invariants import GraphInvariants, invariants_of
+from brocs.traversal import block_subgraphs
 
 logger = logging.getLogger("[BROOKS]")
 
 
+def _checked_flow(token: CancellationToken):
+    """Flow function of ``nx.minimum_node_cut``, which computes a flow for
+    many pairs of vertices, checking the token before each of them. Runs
+    the default ``edmonds_karp``, so the cut is the same.
+    """
+
+    def flow_func(G, s, t, **kwargs):
+        token.check()
+        return edmonds_karp(G, s, t, **kwargs)
+
+    return flow_func
+
+
 class BrooksAlgorithm(ColoringAlgorithm):
     """Graphs coloring algorithm based on the proof
     of the Brooks' theorem.
 
     Args:
         random_state: Seed for random. Makes algorithm deterministic.
+        jobs: Number of processes coloring connected components of
+            a disconnected graph, or blocks of a 1-connected one.
+        backend: Backend of the coloring kernels, "auto", "python" or
+            "numba", see ``brocs.algorithms.kernels``.
     """
 
     random_state: Optional[int]
     cs_algorithm: ConnectedSequential
 
-    def __init__(self, random_state: Optional[int] = None) -> None:
+    def __init__(
+        self, random_state: Optional[int] = None, jobs: int = 1, backend: str = "auto"
+    ) -> None:
         super().__init__()
         self.random_state = random_state
-        self.cs_algorithm = ConnectedSequential(random_state=random_state)
-
-    def color_graph(self, G: nx.Graph) -> List[int]:
+        self.jobs = jobs
+        self.backend = backend
+        self.cs_algorithm = ConnectedSequential(
+            random_state=random_state, backend=backend
+        )
+
+    def with_random_state(self, random_state: Optional[int]) -> "BrooksAlgorithm":
+        algorithm = super().with_random_state(random_state)
+        algorithm.cs_algorithm = self.cs_algorithm.with_random_state(random_state)
+        return algorithm
+
+    def color_graph(self, G: GraphLike) -> np.ndarray:
         """
         Parameters
         ----------
-        G : Graph
-            Graph G from nx library.
+        G : GraphLike
+            Graph G from nx library or its ``CSRGraph`` form.
 
         Returns
         -------
-        colors : List
-            List of colors (non-negative integers), representing good coloring
+        colors : np.ndarray
+            Array of colors (non-negative integers), representing good coloring
             of Graph G. Coloring is generated by the algorithm adapted from Brooks theorem
 
         """
-        # Relabed graph G to natural numbers
-        nodes = G.nodes()
-        mapping = dict(zip(nodes, range(len(nodes))))
-        G = nx.relabel_nodes(G, mapping)
+        # Array form for the sequencing and coloring loops, networkx view
+        # labeled with natural numbers for the structural queries. Both,
+        # like the cycle and pairs of distance two, are cached per graph.
+        invariants = invariants_of(G)
+        recorder = current_recorder()
+        token = current_token()
+        with recorder.span("components"):
+            is_connected = invariants.is_connected
+        if not is_connected:
+            return color_components(self, invariants, self.jobs)
+
+        # Blocks are colored on their own and glued at the cut vertices
+        with recorder.span("block_decomposition"):
+            blocks = invariants.blocks
+        if blocks.is_articulation.any():
+            logger.info("Graph G is 1-connected")
+            with recorder.span("block_cut_tree"):
+                return self._color_block_cut_tree(invariants)
+
+        csr = invariants.csr
+        G = invariants.networkx
         nodes = G.nodes()
         if self.random_state is not None:
             random.seed(self.random_state)
@@ -63,16 +121,16 @@ class BrooksAlgorithm(ColoringAlgorithm):
         number_of_nodes = len(nodes)
 
         # Define output array
-        colors = [-1] * number_of_nodes
+        backend = resolve_backend(self.backend)
+        colors = empty_colors(number_of_nodes, backend)
 
         # Key verticies explained in the technical documentation
         a, b, x = (None, None, None)
 
         # Check if graph G contains a cycle
-        cycle = None
-        try:
-            cycle = nx.find_cycle(G, orientation="ignore")
-        except nx.NetworkXNoCycle:
+        with recorder.span("find_cycle"):
+            cycle = invariants.cycle
+        if cycle is None:
             logger.info("There is no cycle in graph G")
 
         # If graph itself is a cycle
@@ -81,230 +139,138 @@ class BrooksAlgorithm(ColoringAlgorithm):
             return self.cs_algorithm.color_graph(G)
 
         # Find all pairs of distance two
-        S = dist_two(G)
+        with recorder.span("dist_two"):
+            S = invariants.dist_two
         logger.debug(S)
 
         # If S is empty then graph G is complete. Simple coloring
-        if S == set():
+        if len(S) == 0:
             logger.info("Graph G is complete")
-            return list(range(number_of_nodes))
+            return compact_coloring(range(number_of_nodes))
 
         # Serach for optimal a and b vertexes
-        is_two_connected = True
-
-        S_list = list(S)
+        S_list = [tuple(pair) for pair in S.tolist()]
         random.shuffle(S_list) # add some randomness to the algorithm - thanks to this trick it will give better results sometimes
         logger.debug(S_list)
 
-        for pair in S_list:
-            reduced_vertices = [i for i in range(number_of_nodes) if i not in pair]
-            subG = nx.induced_subgraph(G, reduced_vertices)
-            if nx.is_connected(subG):
-                a, b = pair
-                break
-
-            is_two_connected = False
-
-        # If graph is maximum 1 connected
-        if not is_two_connected:
-            logger.info("Graph G is maximum 1 connected")
-            logger.debug("G-a-b is not connected")
-
-            G_cut_nodes = nx.minimum_node_cut(G)
-            assert isinstance(G_cut_nodes, set), "Wrong graph labels"
-
-            if len(G_cut_nodes) == 1:
-                logger.info("G is 1-connected")
-
-                x = G_cut_nodes.pop()
-                set_x_neighbors = set(G.neighbors(x))
-                neighbor_colors = set()
-
-                reduced_vertices = [i for i in range(number_of_nodes) if i != x]
+        with recorder.span("pair_search"):
+            for pair in S_list:
+                token.check()
+                reduced_vertices = [
+                    i for i in range(number_of_nodes) if i not in pair
+                ]
                 subG = nx.induced_subgraph(G, reduced_vertices)
-
-                # miejsce do popisu to mozna zoptymalizować
-                components = [c for c in nx.connected_components(subG)]
-
-                component = components[-1]
-
-                rest_of_graph = set(range(number_of_nodes)) - set(component)
-
-                subG = G.subgraph(component)
-                subG_size = len(component)
-                sub_colors = self.color_graph(subG)
-                sub_dict = dict(zip(range(subG_size), subG))
-
-                for i in range(subG_size):
-                    colors[sub_dict[i]] = sub_colors[i]
-                
-                logger.info(sub_colors)
-
-                restG = G.subgraph(rest_of_graph)
-                restG_size = len(rest_of_graph)
-                rest_colors = self.color_graph(restG)
-                rest_dict = dict(zip(range(restG_size), restG))
-                re_rest_dict = dict(zip(restG, range(restG_size)))
-
-                logger.info(rest_colors)
-
-                for neighbor in set_x_neighbors & set(component):
-                    neighbor_colors.add(colors[neighbor])
-
-                x_color = rest_colors[re_rest_dict[x]]
-
-                if x_color in neighbor_colors:
-                    color_for_x = 0
-
-                    while color_for_x in neighbor_colors:
-                        color_for_x += 1
-
-                    for i in range(restG_size):  # replace the colors
-                        if rest_colors[i] == color_for_x:
-                            rest_colors[i] = x_color
-                        elif rest_colors[i] == x_color:
-                            rest_colors[i] = color_for_x
-
-                for i in range(restG_size):
-                    colors[rest_dict[i]] = rest_colors[i]
-
-                return colors
-            # =============================================================================
-            #             for component in components:
-            #                 subG = G.subgraph(component)
-            #                 subG_size = len(component)
-            #                 sub_colors = connected_sequential(subG)
-            #                 sub_dict = dict(zip(range(subG_size), subG))
-            #                 re_sub_dict = dict(zip(subG, range(subG_size)))
-            #
-            #                 component_neighbors = (component & set_x_neighbors)
-            #
-            #
-            #                 for v in component_neighbors:
-            #                     neighbor_colors.add(sub_colors[re_sub_dict[v]])
-            #                 else:
-            #                     for i in range(subG_size): # replace the colors
-            #                         if sub_colors[i] == neighbor_color:
-            #                             sub_colors[i] = replace_color
-            #                         elif sub_colors[i] == replace_color:
-            #                             sub_colors[i] = neighbor_color
-            #
-            #                 for i in range(subG_size):
-            #                      colors[sub_dict[i]] = sub_colors[i]
-            #
-            #
-            #             colors[x] = replace_color
-            #             return colors
-            # =============================================================================
-
+                recorder.count("subgraph_builds")
+                if nx.is_connected(subG):
+                    a, b = pair
+                    break
+
+        # G - a - b is disconnected for every pair, so a, b and x are found
+        # by looking at G - t
+        if a is None:
+            logger.info("Graph G is 2 connected")
+            logger.debug("G-a-b is not connected")
+            t = None
+            for v in nodes:
+                if 3 <= G.degree[v] < number_of_nodes - 1:
+                    t = v
+                    break
+
+            # every vertex has incorrect degree
+            if t is None:
+                logger.info("Graph G is a extended star graph or a cycle")
+                return self.cs_algorithm.color_graph(G)
+
+            reduced_vertices = [i for i in range(number_of_nodes) if i != t]
+            subG = nx.induced_subgraph(G, reduced_vertices)
+            recorder.count("subgraph_builds")
+            with recorder.span("minimum_node_cut"):
+                cut_nodes = nx.minimum_node_cut(
+                    subG, flow_func=_checked_flow(token)
+                )
+
+            if len(cut_nodes) >= 2:
+                a = t
+                b = dist_two_from(csr, a)
             else:
-                logger.info("Graph G is 2 connected")
-                t = None
-                for v in nodes:
-                    if 3 <= G.degree[v] < number_of_nodes - 1:
-                        t = v
-                        break
-
-                # every vertex has incorrect degree
-                if not t:
-                    logger.info("Graph G is a extended star graph or a cycle")
-                    return self.cs_algorithm.color_graph(G)
-
-                reduced_vertices = [i for i in range(number_of_nodes) if i != t]
-                subG = nx.induced_subgraph(G, reduced_vertices)
-                cut_nodes = nx.minimum_node_cut(subG)
-
-                if len(cut_nodes) >= 2:
-                    a = t
-                    b = dist_two_from(G, a)
-                else:
-                    # to moze byc zle
-                    components = [c for c in nx.biconnected_components(subG)]
-
-                    # now we look for disjoint points
-
-                    disjoint_points = [-1] * len(components)
-
-                    for i in range(len(components)):
-                        for j in range(len(components)):
-                            if i != j:
-                                common_vertices = (
-                                    set(components[i]) & set(components[j])
-                                ).pop()
-                                if common_vertices:
-                                    disjoint_points[i] = common_vertices
-                                    break
-
-                    x = t
-                    x_neighbors = set(G.neighbors(x))
-
-                    # select a and b from endblocks
-                    a = (
-                        (set(components[0]) - {disjoint_points[0]}) & x_neighbors
-                    ).pop()
-                    b = (
-                        (set(components[1]) - {disjoint_points[1]}) & x_neighbors
-                    ).pop()
-
-        # =============================================================================
-        #                 reduced_vertices = [i for i in range(m) if i != x]
-        #
-        #                 subG = nx.induced_subgraph(G, reduced_vertices)
-        #
-        #                 # miejsce do popisu to mozna zoptymalizować
-        #                 components = [c for c in nx.connected_components(subG)]
-        #
-        #                 b1 = components[0]
-        #                 b2 = components[1]
-        #
-        #                 a = list(set(b1) & set_x_neighbors)[0]
-        #                 b = list(set(b2) & set_x_neighbors)[0]
-        #
-        #                 print(a, b, x)
-        # =============================================================================
+                # G - t has cut vertices. G is 2 connected, so t has
+                # a neighbor inside every end block of G - t (a block with
+                # a single cut vertex), and two such neighbors from different
+                # end blocks are not adjacent and do not disconnect G.
+                cut_vertices = set(nx.articulation_points(subG))
+                x = t
+                x_neighbors = set(G.neighbors(x))
+                a, b = [
+                    min((set(block) - cut_vertices) & x_neighbors)
+                    for block in nx.biconnected_components(subG)
+                    if len(set(block) & cut_vertices) == 1
+                ][:2]
 
         colors[a], colors[b] = 0, 0
 
-        if not x:
-            x = find_common_neighbor(G, a, b)
+        if x is None:
+            x = find_common_neighbor(csr, a, b)
 
-        q = LifoQueue()
-        neighbors_queue = Queue()
+        # sequence of vertices reachable from x, without a and b, colored
+        # from its end, so x is colored last
+        is_visited = bytearray(number_of_nodes)
+        is_visited[a], is_visited[b] = True, True
+        connected_sequential(csr, x, colors, is_visited, reverse=True, backend=backend)
 
-        is_visited = [False] * number_of_nodes
+        return compact_coloring(colors)
 
-        is_visited[a], is_visited[b] = True, True
-        neighbors_queue.put(x)
-
-        # create sequence
-
-        while not neighbors_queue.empty():
-            # while there exist a vertex not in the sequence
-            v = neighbors_queue.get()
-            if is_visited[v]:
-                continue
-            q.put(v)
-            for neighbor in G.neighbors(v):
-                neighbors_queue.put(neighbor)
-
-            is_visited[v] = True
-
-        # color vertices in order given by the sequence
-
-        while not q.empty():
-            v = q.get()
-            if colors[v] == -1:
-                # if the actual vertex is uncolored
-                neighbors = G.neighbors(v)
-                forbidden_colors = []
-                for neighbor in neighbors:
-                    if colors[neighbor] != -1:
-                        forbidden_colors.append(colors[neighbor])
-
-                # now we find the smallest color that we can use
-                color = 0
-                while color in forbidden_colors:
-                    color += 1
-                colors[v] = color  # color the choosen vertex
-
-        return colors
+    def _color_block_cut_tree(self, invariants: GraphInvariants) -> np.ndarray:
+        """Colors every block of a 1-connected graph on its own, then walks
+        the block-cut tree from the first block. A block reached through
+        cut vertex c gets the color of c swapped with the one c already
+        has, which costs O(block size) and keeps the block proper, so the
+        whole graph is colored in linear time without recursion.
+        """
+        decomposition = invariants.blocks
+        is_articulation = decomposition.is_articulation
+        blocks = [sorted(block) for block in decomposition.blocks]
+
+        # an edge is a block by itself and needs no algorithm
+        larger = [i for i, block in enumerate(blocks) if len(block) > 2]
+        parts = block_subgraphs(invariants.csr, decomposition, larger)
+        colorings = color_subgraphs(self, [part for _, part in parts], self.jobs)
+        block_colors = [[0, 1]] * len(blocks)
+        for i, coloring in zip(larger, colorings):
+            block_colors[i] = coloring.tolist()
+
+        blocks_of_cut: dict = {}
+        for c in np.flatnonzero(is_articulation).tolist():
+            blocks_of_cut[c] = []
+        for i, block in enumerate(blocks):
+            for v in block:
+                if v in blocks_of_cut:
+                    blocks_of_cut[v].append(i)
+
+        colors = [-1] * invariants.number_of_nodes
+        for v, color in zip(blocks[0], block_colors[0]):
+            colors[v] = color
+        is_reached = bytearray(len(blocks))
+        is_reached[0] = True
+        queue = deque([0])
+        token = current_token()
+        while queue:
+            token.check()
+            block = queue.popleft()
+            # the first block reaching a cut vertex hands its color to
+            # the other blocks of the cut vertex
+            for v in blocks[block]:
+                for i in blocks_of_cut.pop(v, ()):
+                    if is_reached[i]:
+                        continue
+                    is_reached[i] = True
+                    queue.append(i)
+                    color = colors[v]
+                    own = block_colors[i][blocks[i].index(v)]
+                    for w, local in zip(blocks[i], block_colors[i]):
+                        if local == own:
+                            local = color
+                        elif local == color:
+                            local = own
+                        colors[w] = local
+
+        return compact_coloring(colors)
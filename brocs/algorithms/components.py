@@ -0,0 +1,107 @@
+"""
+Coloring of disconnected graphs one connected component at a time.
+
+Subgraphs that are colored on their own, like components or blocks,
+may be spread over a pool of processes.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+from brocs.csr import CSRGraph
+from brocs.helpers import compact_coloring
+from brocs.instrumentation import current_recorder
+from brocs.invariants import GraphInvariants, invariants_of
+
+if TYPE_CHECKING:
+    from brocs.algorithms.base import ColoringAlgorithm
+
+logger = logging.getLogger(__name__)
+
+# subgraphs sent to a worker process at once, tiny ones are not worth
+# a round trip each
+SUBGRAPHS_PER_TASK = 64
+
+
+def normalize_component_colors(colors: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Renumbers colors in every component by decreasing size of their
+    color classes, so color 0 is the largest class of every component and
+    each component uses colors 0..k-1. Permuting colors inside a component
+    keeps the coloring proper.
+    """
+    if not len(colors):
+        return colors
+    colors = colors.astype(np.int64)
+    labels = labels.astype(np.int64)
+    keys = labels * (int(colors.max()) + 1) + colors
+    classes, first_index, inverse, counts = np.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True
+    )
+    class_labels = labels[first_index]
+
+    # classes of one component next to each other, larger classes first
+    order = np.lexsort((classes, -counts, class_labels))
+    sorted_labels = class_labels[order]
+    first = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    sizes = np.diff(np.r_[first, len(order)])
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order)) - np.repeat(first, sizes)
+    return ranks[inverse.ravel()]
+
+
+def _color_connected(algorithm: "ColoringAlgorithm", csr: CSRGraph) -> np.ndarray:
+    invariants_of(csr).assume_connected()
+    return algorithm.color_graph(csr)
+
+
+def color_subgraphs(
+    algorithm: "ColoringAlgorithm", subgraphs: List[CSRGraph], jobs: int = 1
+) -> List[np.ndarray]:
+    """Colors connected subgraphs with the algorithm, on a pool of jobs
+    processes when jobs > 1. A seeded algorithm reseeds itself for every
+    subgraph, so the colorings do not depend on jobs.
+    """
+    if jobs <= 1 or len(subgraphs) <= 1:
+        return [_color_connected(algorithm, subgraph) for subgraph in subgraphs]
+
+    chunksize = max(1, min(SUBGRAPHS_PER_TASK, len(subgraphs) // (4 * jobs)))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(
+            executor.map(
+                _color_connected,
+                [algorithm] * len(subgraphs),
+                subgraphs,
+                chunksize=chunksize,
+            )
+        )
+
+
+def color_components(
+    algorithm: "ColoringAlgorithm", invariants: GraphInvariants, jobs: int = 1
+) -> np.ndarray:
+    """Colors every connected component with the algorithm on its own and
+    merges the colorings.
+
+    Components are found and split off in one linear pass, then colored
+    by ``color_subgraphs``.
+
+    Returns:
+        Coloring of the whole graph, with the colors of every component
+        renumbered by ``normalize_component_colors``.
+    """
+    recorder = current_recorder()
+    number_of_components, labels = invariants.components
+    with recorder.span("split_components"):
+        parts = invariants.csr.split(labels)
+    recorder.count("subgraph_builds", len(parts))
+    logger.info(f"Coloring {number_of_components} components separately")
+
+    colorings = color_subgraphs(algorithm, [subgraph for _, subgraph in parts], jobs)
+
+    colors = np.empty(invariants.number_of_nodes, dtype=np.int64)
+    for (vertices, _), coloring in zip(parts, colorings):
+        colors[vertices] = coloring
+    return compact_coloring(normalize_component_colors(colors, labels))
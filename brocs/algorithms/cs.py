@@ -9,13 +9,22 @@ Connected sequential algorithm
 
 import logging
 import random
-from queue import Queue
-from typing import List, Optional
+from typing import Iterable, Optional, Union
 
-import networkx as nx
-from networkx.classes import Graph
+import numpy as np
 
 from brocs.algorithms.base import ColoringAlgorithm
+from brocs.algorithms.components import color_components, normalize_component_colors
+from brocs.algorithms.kernels import (
+    color_marks,
+    connected_sequential,
+    connected_sequential_many,
+    empty_colors,
+    resolve_backend,
+)
+from brocs.csr import GraphLike, PackedGraphs, as_packed
+from brocs.helpers import compact_coloring
+from brocs.invariants import invariants_of
 
 """
 Parameters
@@ -25,7 +34,7 @@ G : Graph
 
 Returns
 -------
-colors : List
+colors : np.ndarray
 
 """
 
@@ -37,50 +46,88 @@ class ConnectedSequential(ColoringAlgorithm):
 
     Args:
         random_state: Seed for random. Makes algorithm deterministic.
+        jobs: Number of processes coloring connected components of
+            a disconnected graph.
+        backend: Backend of the coloring kernels, "auto", "python" or
+            "numba", see ``brocs.algorithms.kernels``.
     """
 
     random_state: Optional[int]
 
-    def __init__(self, random_state: Optional[int] = None) -> None:
+    def __init__(
+        self, random_state: Optional[int] = None, jobs: int = 1, backend: str = "auto"
+    ) -> None:
         super().__init__()
         self.random_state = random_state
+        self.jobs = jobs
+        self.backend = backend
 
-    def color_graph(self, G: Graph) -> List[int]:
+    def color_graph(self, G: GraphLike) -> np.ndarray:
         if self.random_state is not None:
             random.seed(self.random_state)
 
-        # Relabel graph G
-        nodes = G.nodes()
-        mapping = dict(zip(nodes, range(len(nodes))))
-        G = nx.relabel_nodes(G, mapping)
-
-        nodes = list(G.nodes())
-        m = len(nodes)
-
-        # TODO - check if graph is connected
-
-        colors = [-1] * m
-
-        forbidden_colors = []
-        q = Queue()
-        q.put(random.randint(0, m - 1))  # put random first vertex
-
-        while not q.empty():
-            v = q.get()
-            if colors[v] == -1:
-                # if the actual vertex is uncolored
-                neighbors = G.neighbors(v)
-                forbidden_colors = []
-                for neighbor in neighbors:
-                    if colors[neighbor] == -1:
-                        q.put(neighbor)
-                    else:
-                        forbidden_colors.append(colors[neighbor])
-
-                # now we find the smallest color that we can use
-                color = 0
-                while color in forbidden_colors:
-                    color += 1
-                colors[v] = color  # color the choosen vertex
-
-        return colors
+        invariants = invariants_of(G)
+        if not invariants.is_connected:
+            return color_components(self, invariants, self.jobs)
+
+        csr = invariants.csr
+        m = csr.number_of_nodes()
+        backend = resolve_backend(self.backend)
+
+        colors = empty_colors(m, backend)
+        if m == 0:
+            return compact_coloring(colors)
+
+        # color vertices in the BFS order from a random first vertex
+        connected_sequential(csr, random.randint(0, m - 1), colors, backend=backend)
+
+        return compact_coloring(colors)
+
+    def color_many(
+        self, graphs: Union[PackedGraphs, Iterable[GraphLike]]
+    ) -> np.ndarray:
+        """Colors all graphs in a single pass over the packed union.
+
+        Every connected component is colored from the first vertex
+        ``color_graph`` would draw for it, components of disconnected
+        graphs are renumbered like in ``color_components``.
+        """
+        packed = as_packed(graphs)
+        backend = resolve_backend(self.backend)
+        union = packed.graph
+        labels = packed.components
+
+        # vertices of every component in increasing order, so the i-th of
+        # them is vertex i of the component
+        sizes = np.bincount(labels)
+        by_component = np.argsort(labels, kind="stable")
+        first_vertices = []
+        if self.random_state is None:
+            first_vertices = [random.randint(0, size - 1) for size in sizes.tolist()]
+        else:
+            # every seeded call draws the same vertex for the same size
+            drawn: dict[int, int] = {}
+            for size in sizes.tolist():
+                if size not in drawn:
+                    random.seed(self.random_state)
+                    drawn[size] = random.randint(0, size - 1)
+                first_vertices.append(drawn[size])
+        starts = np.cumsum(sizes) - sizes
+        roots = by_component[starts + np.asarray(first_vertices, dtype=np.int64)]
+
+        colors = empty_colors(union.number_of_nodes(), backend)
+        connected_sequential_many(
+            union,
+            roots.tolist(),
+            colors,
+            marks=color_marks(union, backend),
+            backend=backend,
+        )
+
+        colors = np.asarray(colors, dtype=np.int64)
+        is_split = np.repeat(packed.number_of_components > 1, packed.sizes)
+        if is_split.any():
+            colors[is_split] = normalize_component_colors(
+                colors[is_split], labels[is_split]
+            )
+        return compact_coloring(colors)
@@ -0,0 +1,272 @@
+"""
+Greedy coloring kernels shared by the coloring algorithms.
+
+Sequences come from ``brocs.traversal.bfs_order``, which marks vertices
+when they are enqueued, so every vertex enters its plain ``deque`` once.
+The smallest free color is found with a stamp array instead of scanning a
+list of forbidden colors, so coloring a vertex costs O(deg(v)).
+
+Two backends run the kernels. The "python" one works on lists. The
+"numba" one, used when Numba is installed, compiles the same loops over
+NumPy arrays, so colors are kept in an int64 array instead of a list.
+Both color vertices in the same order and give identical colorings.
+The compiled kernel is built, or loaded from the Numba cache, when this
+module is imported, for the array types of ``CSRGraph``, so the first
+coloring of a process does not pay for it inside a timed run.
+
+With a ``brocs.instrumentation.Recorder`` the kernels record the time of
+sequencing and coloring, and count neighbor visits and color probes.
+The counts follow from the colored sequence, so the loops stay as they are.
+The budget of a run is checked between the colored sequences.
+"""
+
+from itertools import chain
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from brocs.budget import current_token
+from brocs.csr import CSRGraph
+from brocs.instrumentation import NullRecorder, current_recorder
+from brocs.traversal import bfs_order
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("auto", "python", "numba")
+
+Colors = Union[List[int], np.ndarray]
+
+
+def resolve_backend(backend: str) -> str:
+    """Backend running the kernels, "auto" picks numba when it is installed.
+
+    Raises:
+        ValueError: Unknown backend, or numba asked for but not installed.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, use one of {BACKENDS}")
+    if backend == "auto":
+        return "python" if numba is None else "numba"
+    if backend == "numba" and numba is None:
+        raise ValueError("The numba backend needs Numba, install it or use python")
+    return backend
+
+
+def empty_colors(n: int, backend: str = "python") -> Colors:
+    """Colors of n uncolored vertices, in the container of the backend."""
+    if backend == "numba":
+        return np.full(n, -1, dtype=np.int64)
+    return [-1] * n
+
+
+def color_marks(csr: CSRGraph, backend: str = "python") -> Colors:
+    """Stamp array for ``first_fit``. First fit never uses a color larger
+    than the degree of a vertex, so Delta + 2 entries are enough.
+    """
+    delta = int(csr.degrees.max()) if csr.number_of_nodes() else 0
+    if backend == "numba":
+        return np.zeros(delta + 2, dtype=np.int64)
+    return [0] * (delta + 2)
+
+
+def first_fit(
+    csr: CSRGraph,
+    order: Sequence[int],
+    colors: List[int],
+    marks: Optional[List[int]] = None,
+) -> None:
+    """Colors vertices in the given order with the smallest color not used
+    by their neighbors. Vertices colored before (colors[v] >= 0) constrain
+    their neighbors as well, -1 marks an uncolored vertex.
+
+    Args:
+        csr: Graph to color.
+        order: Vertices to color, in order.
+        colors: Colors of all vertices, updated in place.
+        marks: Stamp array from ``color_marks``, reused across calls.
+    """
+    if marks is None:
+        marks = color_marks(csr)
+    indptr = memoryview(csr.indptr)
+    indices = memoryview(csr.indices)
+    for v in order:
+        # v + 1 is unique to this vertex, marks never have to be cleared
+        stamp = v + 1
+        for w in indices[indptr[v] : indptr[v + 1]]:
+            color = colors[w]
+            if color >= 0:
+                marks[color] = stamp
+        color = 0
+        while marks[color] == stamp:
+            color += 1
+        colors[v] = color
+
+
+def _connected_sequential_arrays(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    roots: np.ndarray,
+    colors: np.ndarray,
+    visited: np.ndarray,
+    marks: np.ndarray,
+    reverse: bool,
+) -> np.ndarray:
+    """``bfs_order`` followed by ``first_fit`` from every root not visited
+    yet, over NumPy arrays, the body of the compiled kernel. A plain array
+    serves as the queue, as every vertex is enqueued once.
+    """
+    order = np.empty(len(visited), dtype=np.int64)
+    end = 0
+    for root in roots:
+        if visited[root]:
+            continue
+        start = end
+        visited[root] = 1
+        order[end] = root
+        end += 1
+        head = start
+        while head < end:
+            v = order[head]
+            head += 1
+            for position in range(indptr[v], indptr[v + 1]):
+                w = indices[position]
+                if not visited[w]:
+                    visited[w] = 1
+                    order[end] = w
+                    end += 1
+        if reverse:
+            order[start:end] = order[start:end][::-1].copy()
+
+        for k in range(start, end):
+            v = order[k]
+            stamp = v + 1
+            for position in range(indptr[v], indptr[v + 1]):
+                color = colors[indices[position]]
+                if color >= 0:
+                    marks[color] = stamp
+            color = 0
+            while marks[color] == stamp:
+                color += 1
+            colors[v] = color
+    return order[:end].copy()
+
+
+if numba is not None:
+    # indptr is int32, or int64 for graphs over 2^31 stored half-edges
+    _connected_sequential_compiled = numba.njit(
+        [
+            f"int64[::1]({indptr}[::1], int32[::1], int64[::1], int64[::1], "
+            "uint8[::1], int64[::1], boolean)"
+            for indptr in ("int32", "int64")
+        ],
+        cache=True,
+    )(_connected_sequential_arrays)
+
+
+def connected_sequential(
+    csr: CSRGraph,
+    root: int,
+    colors: Colors,
+    visited: Optional[bytearray] = None,
+    marks: Optional[Colors] = None,
+    reverse: bool = False,
+    backend: str = "python",
+) -> Sequence[int]:
+    """First fit over the vertices reachable from root, in breadth first
+    order, or in the reverse of it.
+
+    Args:
+        backend: Resolved backend, see ``resolve_backend``. With "numba"
+            colors and marks are arrays from ``empty_colors`` and
+            ``color_marks``.
+
+    Returns:
+        The colored sequence.
+    """
+    return connected_sequential_many(
+        csr, [root], colors, visited, marks, reverse, backend
+    )
+
+
+def connected_sequential_many(
+    csr: CSRGraph,
+    roots: Sequence[int],
+    colors: Colors,
+    visited: Optional[bytearray] = None,
+    marks: Optional[Colors] = None,
+    reverse: bool = False,
+    backend: str = "python",
+) -> Sequence[int]:
+    """``connected_sequential`` from every root in turn, roots reached from
+    an earlier one are skipped. Colors every component of a disjoint union
+    of graphs in one call.
+
+    Returns:
+        The colored sequences, one after another.
+    """
+    if visited is None:
+        visited = bytearray(csr.number_of_nodes())
+    if marks is None:
+        marks = color_marks(csr, backend)
+    recorder = current_recorder()
+    token = current_token()
+    token.check()
+
+    if backend == "numba":
+        # one compiled loop does both, it is recorded as a single span
+        with recorder.span("sequencing_and_coloring"):
+            order = _connected_sequential_compiled(
+                csr.indptr,
+                csr.indices,
+                np.asarray(roots, dtype=np.int64),
+                colors,
+                np.frombuffer(visited, dtype=np.uint8),
+                marks,
+                reverse,
+            )
+        token.check()
+        if recorder.enabled:
+            _count_operations(recorder, csr, order, colors)
+        return order
+
+    # traversals do not look at colors, so all sequences can be found
+    # before any of them is colored
+    sequences = []
+    with recorder.span("sequencing"):
+        for root in roots:
+            if visited[root]:
+                continue
+            token.check()
+            order = bfs_order(csr, root, visited)
+            if reverse:
+                order.reverse()
+            sequences.append(order)
+    with recorder.span("coloring"):
+        for order in sequences:
+            token.check()
+            first_fit(csr, order, colors, marks)
+    if len(sequences) == 1:
+        order = sequences[0]
+    else:
+        order = list(chain.from_iterable(sequences))
+    if recorder.enabled:
+        _count_operations(recorder, csr, order, colors)
+    return order
+
+
+def _count_operations(
+    recorder: NullRecorder, csr: CSRGraph, order: Sequence[int], colors: Colors
+) -> None:
+    """Counts the work of coloring a sequence. The traversal and first fit
+    both scan all neighbors of every vertex once, and first fit probes
+    colors 0..colors[v] of vertex v.
+    """
+    order = np.asarray(order, dtype=np.int64)
+    recorder.count("colored_vertices", len(order))
+    recorder.count("neighbor_visits", 2 * int(csr.degrees[order].sum()))
+    recorder.count(
+        "color_probes", int(np.asarray(colors)[order].sum()) + len(order)
+    )
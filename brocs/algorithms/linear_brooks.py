@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Linear time Brooks theorem algorithm
+
+Follows the constructive proof of the Brooks' theorem, every step is
+a single linear traversal of the graph, so the whole coloring is O(n + m).
+BrooksAlgorithm stays available as the reference implementation.
+"""
+
+import logging
+import random
+from typing import Optional
+
+import numpy as np
+
+from brocs.algorithms.base import ColoringAlgorithm
+from brocs.algorithms.components import color_components
+from brocs.algorithms.kernels import (
+    Colors,
+    color_marks,
+    connected_sequential,
+    empty_colors,
+    resolve_backend,
+)
+from brocs.csr import CSRGraph, GraphLike
+from brocs.helpers import compact_coloring, find_common_neighbor
+from brocs.instrumentation import current_recorder
+from brocs.invariants import invariants_of
+from brocs.traversal import block_decomposition
+
+logger = logging.getLogger("[BROOKS]")
+
+
+class LinearBrooksAlgorithm(ColoringAlgorithm):
+    """Graphs coloring algorithm based on the proof of the Brooks' theorem,
+    running in O(n + m).
+
+    Every connected component is colored on its own with at most Delta
+    colors, where Delta is its maximal degree, unless it is a complete graph
+    or an odd cycle.
+
+    Args:
+        random_state: Seed for random. Makes algorithm deterministic.
+        jobs: Number of processes coloring connected components of
+            a disconnected graph.
+        backend: Backend of the coloring kernels, "auto", "python" or
+            "numba", see ``brocs.algorithms.kernels``.
+    """
+
+    random_state: Optional[int]
+
+    def __init__(
+        self, random_state: Optional[int] = None, jobs: int = 1, backend: str = "auto"
+    ) -> None:
+        super().__init__()
+        self.random_state = random_state
+        self.jobs = jobs
+        self.backend = backend
+
+    def color_graph(self, G: GraphLike) -> np.ndarray:
+        if self.random_state is not None:
+            random.seed(self.random_state)
+
+        invariants = invariants_of(G)
+        if not invariants.is_connected:
+            return color_components(self, invariants, self.jobs)
+        csr = invariants.csr
+        number_of_nodes = invariants.number_of_nodes
+        backend = resolve_backend(self.backend)
+        colors = empty_colors(number_of_nodes, backend)
+        if number_of_nodes == 0:
+            return compact_coloring(colors)
+
+        degrees = invariants.degrees
+        delta = invariants.delta
+        vertices = np.arange(number_of_nodes)
+        visited = bytearray(number_of_nodes)
+        marks = color_marks(csr, backend)
+
+        deficient = np.flatnonzero(degrees < delta)
+        if len(deficient):
+            # Root has less than Delta neighbors, every other vertex
+            # has its BFS parent colored after itself
+            root = int(random.choice(deficient))
+            logger.debug(f"Vertex {root} has degree < Delta")
+            connected_sequential(
+                csr, root, colors, visited, marks, reverse=True, backend=backend
+            )
+
+        elif number_of_nodes == delta + 1:
+            logger.debug("Graph is complete")
+            colors = list(range(number_of_nodes))
+
+        elif delta <= 2:
+            logger.debug("Graph is a cycle")
+            root = int(random.choice(vertices))
+            connected_sequential(csr, root, colors, visited, marks, backend=backend)
+
+        # One DFS gives the articulation points, only regular graphs need it
+        elif invariants.blocks.is_articulation.any():
+            cut_vertices = np.flatnonzero(invariants.blocks.is_articulation)
+            x = int(random.choice(cut_vertices))
+            logger.debug(f"Graph is 1-connected, cut vertex {x}")
+            self._color_around_cut_vertex(csr, x, visited, colors, marks, backend)
+
+        else:
+            logger.debug("Graph is 2-connected")
+            a, b, x = self._find_a_b_x(csr, vertices)
+            logger.debug(f"Selected a={a}, b={b}, x={x}")
+            colors[a], colors[b] = 0, 0
+            visited[a], visited[b] = True, True
+            connected_sequential(
+                csr, x, colors, visited, marks, reverse=True, backend=backend
+            )
+
+        return compact_coloring(colors)
+
+    def _color_around_cut_vertex(
+        self,
+        csr: CSRGraph,
+        x: int,
+        visited: bytearray,
+        colors: Colors,
+        marks: Colors,
+        backend: str,
+    ) -> None:
+        """Colors a Delta-regular component with cut vertex x.
+
+        Every piece of G - x is colored on its own, x has less than Delta
+        neighbors in each of them. Colors of a piece are then permuted,
+        so that the color free for x is 0 in all of them.
+        """
+        x_neighbors = csr.neighbors(x).tolist()
+        visited[x] = True
+        for u in x_neighbors:
+            if visited[u]:
+                continue
+            piece = connected_sequential(
+                csr, u, colors, visited, marks, reverse=True, backend=backend
+            )
+
+            in_piece = set(piece)
+            neighbor_colors = {colors[w] for w in x_neighbors if w in in_piece}
+            color_for_x = 0
+            while color_for_x in neighbor_colors:
+                color_for_x += 1
+
+            if color_for_x != 0:
+                for v in piece:
+                    if colors[v] == color_for_x:
+                        colors[v] = 0
+                    elif colors[v] == 0:
+                        colors[v] = color_for_x
+
+        colors[x] = 0
+
+    @staticmethod
+    def _find_a_b_x(csr: CSRGraph, component: np.ndarray):
+        """Finds vertices a, b at distance two with a common neighbor x,
+        such that G - a - b stays connected. Component has to be
+        2-connected, Delta-regular with Delta >= 3 and not complete.
+        """
+        x = int(random.choice(component))
+        x_neighbors = csr.neighbors(x)
+
+        rest = component[component != x]
+        recorder = current_recorder()
+        recorder.count("subgraph_builds")
+        with recorder.span("block_decomposition"):
+            decomposition = block_decomposition(csr.subgraph(rest))
+
+        if not decomposition.is_articulation.any():
+            # G - x is 2-connected, so removing any b keeps it connected.
+            # Pair x with a vertex b at distance two from it.
+            close = set(x_neighbors.tolist())
+            close.add(x)
+            for b in csr.gather(x_neighbors).tolist():
+                if b not in close:
+                    return x, b, find_common_neighbor(csr, x, b)
+            raise ValueError("Component is a complete graph")
+
+        # G - x has at least two end blocks, each with exactly one cut
+        # vertex. G is 2-connected, so x has a neighbor inside each of them.
+        is_articulation = decomposition.is_articulation
+        is_x_neighbor = np.isin(rest, x_neighbors)
+        chosen = []
+        for block in decomposition.blocks:
+            block = np.asarray(block)
+            if is_articulation[block].sum() != 1:
+                continue
+            inner = block[~is_articulation[block] & is_x_neighbor[block]]
+            chosen.append(int(rest[inner[0]]))
+            if len(chosen) == 2:
+                break
+
+        a, b = chosen
+        return a, b, x
@@ -0,0 +1,108 @@
+"""
+Time and memory budgets of algorithm runs.
+
+Algorithms call ``check`` of the cancellation token of the current context
+in their main loops, between the sequences they color and around calls
+that may run long. Without a budget the token is a ``CancellationToken``
+whose ``check`` does nothing. A ``BudgetToken`` raises ``BudgetExceeded``
+once the run is over its time or memory budget. Reading the memory of the
+process costs more than reading the clock, so it is looked at most once
+every ``MEMORY_CHECK_INTERVAL`` nanoseconds.
+
+Compiled numba loops and most networkx calls are not interrupted, the
+budget is checked before and after them. Subgraphs colored in worker
+processes (``jobs`` > 1) are not checked.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from brocs.memory import current_rss
+
+# nanoseconds between two looks at the memory of the process
+MEMORY_CHECK_INTERVAL = 1_000_000
+
+
+class BudgetExceeded(Exception):
+    """A run went over its budget, reason is "time" or "memory"."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"Run exceeded its {reason} budget")
+        self.reason = reason
+
+
+@dataclass(slots=True, frozen=True)
+class RunBudget:
+    """Limits of a single run.
+
+    Attributes:
+        time_limit: Nanoseconds the run may take, unlimited when None.
+        memory_limit: Bytes the resident memory of the process may grow by
+            during the run, unlimited when None.
+    """
+
+    time_limit: Optional[int] = None
+    memory_limit: Optional[int] = None
+
+
+class CancellationToken:
+    """Token of runs without a budget, never cancelled."""
+
+    def check(self) -> None:
+        pass
+
+
+class BudgetToken(CancellationToken):
+    """Cancels a run when it goes over the budget, counted from the
+    creation of the token, or when ``cancel`` is called.
+    """
+
+    def __init__(self, budget: RunBudget) -> None:
+        self.budget = budget
+        self.start = time.perf_counter_ns()
+        self.start_rss = current_rss() if budget.memory_limit is not None else 0
+        self.reason: Optional[str] = None
+        self._next_memory_check = self.start
+
+    def cancel(self, reason: str = "time") -> None:
+        self.reason = reason
+
+    def check(self) -> None:
+        budget = self.budget
+        now = time.perf_counter_ns()
+        if self.reason is None and budget.time_limit is not None:
+            if now - self.start > budget.time_limit:
+                self.reason = "time"
+        if (
+            self.reason is None
+            and budget.memory_limit is not None
+            and now >= self._next_memory_check
+        ):
+            self._next_memory_check = now + MEMORY_CHECK_INTERVAL
+            if current_rss() - self.start_rss > budget.memory_limit:
+                self.reason = "memory"
+        if self.reason is not None:
+            raise BudgetExceeded(self.reason)
+
+
+_current: ContextVar[CancellationToken] = ContextVar(
+    "brocs_cancellation_token", default=CancellationToken()
+)
+
+
+def current_token() -> CancellationToken:
+    """Token algorithms check, never cancelled by default."""
+    return _current.get()
+
+
+@contextmanager
+def cancellable(token: CancellationToken) -> Iterator[CancellationToken]:
+    """Makes token the current one inside the ``with`` block."""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from brocs import __version__
+from brocs.algorithms.base import ColoringAlgorithm
+from brocs.csr import GraphLike
+from brocs.evaluation import EvaluationResults
+from brocs.helpers import compact_coloring
+from brocs.invariants import invariants_of
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_BYTES = 1024**3
+
+CACHE_FORMAT_VERSION = 1
+
+
+class ResultCache:
+    """Content-addressed on-disk cache of evaluation results.
+
+    An entry is keyed by the hash of the graph arrays, the algorithm name and
+    parameters, its seed and the package version, so it is reused whenever
+    the same graph is colored again, also after a restart. Every entry is a
+    single .npz file, the least recently used ones are removed when the
+    cache grows over ``max_bytes``.
+
+    Runs without a seed are not reproducible and are never cached.
+
+    Args:
+        directory: Directory holding the cache, created when missing.
+        max_bytes: Size limit of all entries together.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, G: GraphLike, algorithm: ColoringAlgorithm) -> Optional[str]:
+        """Cache key of coloring G with the algorithm, None when the
+        algorithm is not seeded.
+        """
+        if algorithm.random_state is None:
+            return None
+        description = {
+            "graph": invariants_of(G).digest,
+            "algorithm": algorithm.name,
+            "parameters": algorithm.parameters(),
+            "seed": algorithm.random_state,
+            "version": __version__,
+        }
+        text = json.dumps(description, sort_keys=True, default=repr)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def get(self, key: str, G: GraphLike) -> Optional[EvaluationResults]:
+        """Results stored under the key, attached to graph G, or None."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                header = json.loads(str(entry["header"]))
+                coloring = entry["coloring"]
+                color_counts = entry["color_counts"]
+        except FileNotFoundError:
+            return None
+        except Exception as error:
+            logger.warning(f"Removing unreadable cache entry {path}: {error!r}")
+            path.unlink(missing_ok=True)
+            return None
+        if header.get("version") != CACHE_FORMAT_VERSION:
+            return None
+
+        # last use decides the eviction order
+        os.utime(path)
+        first_conflict = header["first_conflict"]
+        return EvaluationResults(
+            graph=G,
+            number_of_nodes=header["number_of_nodes"],
+            delta=header["delta"],
+            unique_colors=header["unique_colors"],
+            is_coloring_correct=header["is_coloring_correct"],
+            coloring=coloring,
+            time_elapsed=header["time_elapsed"],
+            number_of_conflicts=header["number_of_conflicts"],
+            first_conflict=tuple(first_conflict) if first_conflict else None,
+            color_counts=color_counts,
+        )
+
+    def put(self, key: str, results: EvaluationResults) -> None:
+        """Stores results under the key, then evicts old entries if needed."""
+        header = {
+            "version": CACHE_FORMAT_VERSION,
+            "number_of_nodes": int(results.number_of_nodes),
+            "delta": int(results.delta),
+            "unique_colors": int(results.unique_colors),
+            "is_coloring_correct": bool(results.is_coloring_correct),
+            "time_elapsed": int(results.time_elapsed),
+            "number_of_conflicts": int(results.number_of_conflicts),
+            "first_conflict": results.first_conflict,
+        }
+        # written next to the target and renamed, readers never see half a file
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                np.savez(
+                    f,
+                    coloring=compact_coloring(results.coloring),
+                    color_counts=np.asarray(results.color_counts, dtype=np.int64),
+                    header=np.array(json.dumps(header)),
+                )
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            Path(temporary).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits max_bytes."""
+        entries = []
+        total = 0
+        for path in self.directory.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
+        logger.info(f"Result cache {self.directory} trimmed to {total} bytes")
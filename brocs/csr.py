@@ -0,0 +1,352 @@
+"""
+Compact array-backed graph representation shared by the coloring algorithms.
+
+Vertex ``i`` of a ``CSRGraph`` always corresponds to the i-th node of the
+graph it was built from, which is the labelling the algorithms used to get
+from ``nx.relabel_nodes``.
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import cached_property
+from itertools import chain
+from typing import Iterable, List, Tuple, Union
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+logger = logging.getLogger(__name__)
+
+INDEX_DTYPE = np.int32
+
+
+@dataclass(eq=False)
+class CSRGraph:
+    """Undirected simple graph stored as int32 CSR arrays.
+
+    Args:
+        indptr: Offsets of the adjacency lists in ``indices``, length ``n + 1``.
+        indices: Concatenated adjacency lists. Every edge is stored twice,
+            once for each endpoint, self loops are not stored.
+    """
+
+    indptr: np.ndarray
+    indices: np.ndarray
+
+    def __post_init__(self) -> None:
+        # int32 offsets are enough for up to 2^31 stored half-edges
+        indptr_dtype = INDEX_DTYPE
+        if len(self.indptr) and self.indptr[-1] > np.iinfo(INDEX_DTYPE).max:
+            indptr_dtype = np.int64
+        self.indptr = np.ascontiguousarray(self.indptr, dtype=indptr_dtype)
+        self.indices = np.ascontiguousarray(self.indices, dtype=INDEX_DTYPE)
+
+    def number_of_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    def number_of_edges(self) -> int:
+        return len(self.indices) // 2
+
+    def __len__(self) -> int:
+        return self.number_of_nodes()
+
+    @property
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes
+
+    def neighbors(self, v: int) -> np.ndarray:
+        return self.indices[self.indptr[v] : self.indptr[v + 1]]
+
+    def edges(self) -> np.ndarray:
+        """
+        Returns:
+            Array of shape (m, 2) with every edge listed once as (u, v), u < v.
+        """
+        rows = np.repeat(
+            np.arange(self.number_of_nodes(), dtype=INDEX_DTYPE), self.degrees
+        )
+        mask = rows < self.indices
+        return np.stack((rows[mask], self.indices[mask]), axis=1)
+
+    def _adjacency_positions(self, vertices: np.ndarray):
+        """Positions in ``indices`` of the adjacency lists of ``vertices``,
+        list after list, together with the lengths of the lists.
+        """
+        starts = self.indptr[vertices]
+        lengths = self.indptr[vertices + 1] - starts
+        row_offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(int(lengths.sum())) - np.repeat(
+            row_offsets - starts, lengths
+        )
+        return positions, lengths
+
+    def gather(self, vertices: np.ndarray) -> np.ndarray:
+        """Concatenated adjacency lists of ``vertices``, in the given order."""
+        vertices = np.asarray(vertices, dtype=np.int64)
+        positions, _ = self._adjacency_positions(vertices)
+        return self.indices[positions]
+
+    def subgraph(self, vertices: np.ndarray) -> "CSRGraph":
+        """Induced subgraph on ``vertices``.
+
+        Vertex ``i`` of the result is ``vertices[i]`` of this graph,
+        adjacency order is preserved.
+        """
+        vertices = np.asarray(vertices, dtype=np.int64)
+        k = len(vertices)
+        mapping = np.full(self.number_of_nodes(), -1, dtype=np.int64)
+        mapping[vertices] = np.arange(k)
+
+        positions, lengths = self._adjacency_positions(vertices)
+        neighbors = mapping[self.indices[positions]]
+        rows = np.repeat(np.arange(k), lengths)
+        keep = neighbors >= 0
+
+        indptr = np.zeros(k + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[keep], minlength=k), out=indptr[1:])
+        return CSRGraph(indptr, neighbors[keep])
+
+    def split(self, labels: np.ndarray) -> List[Tuple[np.ndarray, "CSRGraph"]]:
+        """Subgraphs induced by the vertices of every label, in one pass.
+
+        No edge may join vertices with different labels, as with labels of
+        connected components. Much cheaper than ``subgraph`` called for
+        every label, which costs O(n) each.
+
+        Returns:
+            For every label from 0 up, its vertices in increasing order
+            and the induced subgraph, in which vertex ``i`` is the i-th of
+            these vertices. Adjacency order is preserved.
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        n = self.number_of_nodes()
+        order = np.argsort(labels, kind="stable")
+        sizes = np.bincount(labels, minlength=1 if n else 0)
+        starts = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=starts[1:])
+
+        local = np.empty(n, dtype=np.int64)
+        local[order] = np.arange(n) - np.repeat(starts[:-1], sizes)
+        positions, lengths = self._adjacency_positions(order)
+        indices = local[self.indices[positions]]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+
+        parts = []
+        for start, end in zip(starts[:-1].tolist(), starts[1:].tolist()):
+            first, last = indptr[start], indptr[end]
+            subgraph = CSRGraph(indptr[start : end + 1] - first, indices[first:last])
+            parts.append((order[start:end], subgraph))
+        return parts
+
+    def to_scipy(self) -> sparse.csr_array:
+        """Adjacency matrix as a SciPy sparse array sharing the index arrays."""
+        n = self.number_of_nodes()
+        data = np.ones(len(self.indices), dtype=np.int32)
+        return sparse.csr_array((data, self.indices, self.indptr), shape=(n, n))
+
+    def to_networkx(self) -> nx.Graph:
+        G = nx.Graph()
+        G.add_nodes_from(range(self.number_of_nodes()))
+        G.add_edges_from(self.edges().tolist())
+        return G
+
+    @classmethod
+    def from_edges(cls, n: int, u: np.ndarray, v: np.ndarray) -> "CSRGraph":
+        """Builds a graph on ``n`` vertices from endpoint arrays.
+
+        Self loops and duplicated edges (in either direction) are dropped,
+        adjacency lists are sorted.
+        """
+        u = np.asarray(u)
+        v = np.asarray(v)
+        mask = u != v
+        u, v = u[mask].astype(np.int64), v[mask].astype(np.int64)
+
+        # one sortable key per half-edge keeps the peak memory at 8 B each
+        keys = np.concatenate((u * n + v, v * n + u))
+        del u, v, mask
+        keys.sort()
+        if len(keys):
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        rows, cols = np.divmod(keys, n)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(indptr, cols)
+
+    @classmethod
+    def from_numpy(cls, matrix: np.ndarray) -> "CSRGraph":
+        """Builds a graph from a dense adjacency matrix, any nonzero is an edge."""
+        if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError(f"Adjacency matrix must be square, got {matrix.shape}")
+        rows, cols = np.nonzero(matrix)
+        return cls.from_edges(matrix.shape[0], rows, cols)
+
+    @classmethod
+    def from_scipy(cls, matrix) -> "CSRGraph":
+        """Builds a graph from a SciPy sparse adjacency matrix."""
+        if matrix.shape[0] != matrix.shape[1]:
+            raise ValueError(f"Adjacency matrix must be square, got {matrix.shape}")
+        coo = sparse.coo_array(matrix)
+        mask = coo.data != 0
+        return cls.from_edges(matrix.shape[0], coo.row[mask], coo.col[mask])
+
+    @classmethod
+    def from_networkx(cls, G: nx.Graph) -> "CSRGraph":
+        """Builds a graph from networkx, keeping the order of ``G.nodes()``
+        and of every adjacency list.
+        """
+        if G.is_directed():
+            G = G.to_undirected(as_view=True)
+        nodes = list(G)
+        n = len(nodes)
+        adj = G.adj
+
+        degrees = np.fromiter(
+            (len(adj[v]) - (v in adj[v]) for v in nodes), dtype=np.int64, count=n
+        )
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+
+        if nodes == list(range(n)):
+            neighbors = chain.from_iterable(adj[v] for v in nodes)
+            if nx.number_of_selfloops(G):
+                neighbors = (u for v in nodes for u in adj[v] if u != v)
+        else:
+            index = {node: i for i, node in enumerate(nodes)}
+            neighbors = (index[u] for v in nodes for u in adj[v] if u != v)
+
+        indices = np.fromiter(neighbors, dtype=INDEX_DTYPE, count=int(indptr[-1]))
+        return cls(indptr, indices)
+
+
+GraphLike = Union[nx.Graph, CSRGraph, np.ndarray, sparse.sparray, sparse.spmatrix]
+
+
+def as_csr(G: GraphLike) -> CSRGraph:
+    """Converts any supported graph representation to a ``CSRGraph``.
+    ``CSRGraph`` instances are returned as they are, without a copy.
+    """
+    if isinstance(G, CSRGraph):
+        return G
+    if isinstance(G, nx.Graph):
+        return CSRGraph.from_networkx(G)
+    if sparse.issparse(G):
+        return CSRGraph.from_scipy(G)
+    if isinstance(G, np.ndarray):
+        return CSRGraph.from_numpy(G)
+    raise TypeError(f"Unsupported graph type: {type(G).__name__}")
+
+
+@dataclass(eq=False)
+class PackedGraphs:
+    """Many graphs stored together as their disjoint union.
+
+    Vertex j of graph i is vertex ``offsets[i] + j`` of ``graph``, so
+    a whole collection of small graphs is colored and evaluated with array
+    operations over a single pair of CSR arrays.
+
+    Args:
+        graph: Disjoint union of the graphs.
+        offsets: First vertex of every graph in the union, followed by the
+            number of vertices of the union, length ``len(self) + 1``.
+    """
+
+    graph: CSRGraph
+    offsets: np.ndarray
+
+    @classmethod
+    def pack(cls, graphs: Iterable[GraphLike]) -> "PackedGraphs":
+        csrs = [as_csr(G) for G in graphs]
+        sizes = np.fromiter((len(csr) for csr in csrs), dtype=np.int64, count=len(csrs))
+        offsets = np.zeros(len(csrs) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+
+        degrees = np.concatenate([csr.degrees for csr in csrs] + [[]]).astype(np.int64)
+        indptr = np.zeros(len(degrees) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+        indices = np.concatenate(
+            [
+                csr.indices.astype(np.int64) + offset
+                for csr, offset in zip(csrs, offsets)
+            ]
+            + [np.empty(0, dtype=np.int64)]
+        )
+        return cls(CSRGraph(indptr, indices), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @cached_property
+    def labels(self) -> np.ndarray:
+        """Index of the graph every vertex of the union belongs to."""
+        return np.repeat(np.arange(len(self)), self.sizes)
+
+    @cached_property
+    def components(self) -> np.ndarray:
+        """Connected component label of every vertex of the union, found
+        with a single search.
+        """
+        if not self.graph.number_of_nodes():
+            return np.zeros(0, dtype=np.int64)
+        _, labels = connected_components(self.graph.to_scipy(), directed=False)
+        return labels.astype(np.int64)
+
+    @cached_property
+    def number_of_components(self) -> np.ndarray:
+        """Number of connected components of every graph."""
+        number_of_components = np.zeros(len(self), dtype=np.int64)
+        nonempty = np.flatnonzero(self.sizes)
+        if not len(nonempty):
+            return number_of_components
+        # components are numbered in the order of their first vertices, so
+        # the ones of a graph follow each other
+        starts = self.offsets[nonempty]
+        last = np.maximum.reduceat(self.components, starts)
+        number_of_components[nonempty] = last - self.components[starts] + 1
+        return number_of_components
+
+    def __getitem__(self, i: int) -> CSRGraph:
+        """Graph i, its arrays are copied out of the union."""
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        first, last = self.graph.indptr[start], self.graph.indptr[end]
+        return CSRGraph(
+            self.graph.indptr[start : end + 1] - first,
+            self.graph.indices[first:last] - start,
+        )
+
+    def unpack(self, values: np.ndarray) -> List[np.ndarray]:
+        """Splits per vertex values of the union, like a coloring, into
+        values of every graph.
+        """
+        return np.split(np.asarray(values), self.offsets[1:-1])
+
+
+def as_packed(graphs: Union[PackedGraphs, Iterable[GraphLike]]) -> PackedGraphs:
+    """Packs graphs into ``PackedGraphs``, packed graphs are returned as
+    they are.
+    """
+    if isinstance(graphs, PackedGraphs):
+        return graphs
+    return PackedGraphs.pack(graphs)
+
+
+def as_networkx(G: GraphLike) -> nx.Graph:
+    """Returns a networkx graph with nodes labeled from 0 to n-1.
+    Graphs that are already labeled that way are returned without a copy.
+    """
+    if isinstance(G, nx.Graph) and not G.is_directed():
+        if list(G) == list(range(G.number_of_nodes())):
+            return G
+    return as_csr(G).to_networkx()
@@ -0,0 +1,283 @@
+"""
+Coloring of a graph changing by small edits.
+
+``DynamicColoring`` colors a graph once with one of the algorithms, then
+keeps the coloring proper while edges and vertices are inserted and
+deleted. Only the vertices around an edit are recolored: a vertex in
+conflict takes the smallest color free among its neighbors, and when that
+would be a color not used yet, a Kempe chain swap (the color swap Brooks
+does at cut vertices, here on a two colored component) tries to free one
+of the used colors first. Vertices losing neighbors move to a smaller
+color when it does not add a color, or when their color got larger than
+their degree.
+
+No vertex has a color larger than its degree, so the coloring uses at most
+Delta + 1 colors of the current graph, whatever edits came before. A repair
+tries a Kempe chain for every pair of a color blocked by the neighbors and
+a used color, at most Delta * (Delta + 1) chains of up to
+``KEMPE_CHAIN_LIMIT`` vertices, whose neighbors are all looked at, so an
+edit costs O(Delta^3 * limit) at most, never O(n).
+"""
+
+import logging
+from typing import Iterable, List, Optional, Set
+
+import numpy as np
+
+from brocs.algorithms.base import ColoringAlgorithm
+from brocs.algorithms.linear_brooks import LinearBrooksAlgorithm
+from brocs.csr import CSRGraph, GraphLike
+from brocs.helpers import compact_coloring
+from brocs.invariants import invariants_of
+
+logger = logging.getLogger(__name__)
+
+# vertices of a Kempe chain explored before the swap is given up
+KEMPE_CHAIN_LIMIT = 256
+
+
+class DynamicColoring:
+    """Proper coloring of a graph, repaired locally after every edit.
+
+    Vertices are numbered like in the initial graph, inserted vertices get
+    the next free numbers. Numbers of deleted vertices are not reused.
+
+    Args:
+        G: Initial graph, empty when None.
+        algorithm: Algorithm coloring the initial graph,
+            ``LinearBrooksAlgorithm`` by default.
+        kempe_chain_limit: Largest Kempe chain swapped by a repair.
+    """
+
+    def __init__(
+        self,
+        G: Optional[GraphLike] = None,
+        algorithm: Optional[ColoringAlgorithm] = None,
+        kempe_chain_limit: int = KEMPE_CHAIN_LIMIT,
+    ) -> None:
+        self.kempe_chain_limit = kempe_chain_limit
+        # neighbors of every vertex, None for deleted vertices
+        self._adjacency: List[Optional[Set[int]]] = []
+        self._colors: List[int] = []
+        self._counts: List[int] = []
+        self._number_of_colors = 0
+        self._number_of_nodes = 0
+        if G is None:
+            return
+
+        csr = invariants_of(G).csr
+        if algorithm is None:
+            algorithm = LinearBrooksAlgorithm()
+        colors = np.asarray(algorithm.color_graph(csr), dtype=np.int64)
+        indptr, indices = csr.indptr.tolist(), csr.indices.tolist()
+        self._adjacency = [
+            set(indices[indptr[v] : indptr[v + 1]])
+            for v in range(csr.number_of_nodes())
+        ]
+        self._colors = colors.tolist()
+        self._counts = np.bincount(colors).tolist()
+        self._number_of_colors = int(np.count_nonzero(self._counts))
+        self._number_of_nodes = csr.number_of_nodes()
+        for v in np.flatnonzero(colors > csr.degrees).tolist():
+            self._lower(v)
+
+    def number_of_nodes(self) -> int:
+        return self._number_of_nodes
+
+    @property
+    def number_of_colors(self) -> int:
+        """Number of colors used by at least one vertex."""
+        return self._number_of_colors
+
+    @property
+    def color_counts(self) -> np.ndarray:
+        """Number of vertices of every color."""
+        return np.array(self._counts, dtype=np.int64)
+
+    def has_vertex(self, v: int) -> bool:
+        return 0 <= v < len(self._adjacency) and self._adjacency[v] is not None
+
+    def has_edge(self, u: int, v: int) -> bool:
+        return self.has_vertex(u) and v in self._adjacency[u]
+
+    def color_of(self, v: int) -> int:
+        self._check_vertex(v)
+        return self._colors[v]
+
+    def coloring(self) -> np.ndarray:
+        """Colors of all vertex numbers, -1 for deleted vertices."""
+        return compact_coloring(self._colors)
+
+    def to_csr(self) -> CSRGraph:
+        """Current graph, deleted vertices are left isolated."""
+        u: List[int] = []
+        w: List[int] = []
+        for v, neighbors in enumerate(self._adjacency):
+            if neighbors:
+                u.extend([v] * len(neighbors))
+                w.extend(neighbors)
+        return CSRGraph.from_edges(len(self._adjacency), u, w)
+
+    def add_vertex(self, neighbors: Iterable[int] = ()) -> int:
+        """Inserts a vertex joined to the given ones and colors it.
+
+        Returns:
+            Number of the new vertex.
+        """
+        neighbors = set(neighbors)
+        for w in neighbors:
+            self._check_vertex(w)
+        v = len(self._adjacency)
+        self._adjacency.append(neighbors)
+        self._colors.append(-1)
+        self._number_of_nodes += 1
+        for w in neighbors:
+            self._adjacency[w].add(v)
+        self._repair(v)
+        return v
+
+    def remove_vertex(self, v: int) -> None:
+        """Deletes vertex v with its edges. Its former neighbors may move
+        to smaller colors.
+        """
+        self._check_vertex(v)
+        neighbors = self._adjacency[v]
+        for w in neighbors:
+            self._adjacency[w].discard(v)
+        self._set_color(v, -1)
+        self._adjacency[v] = None
+        self._number_of_nodes -= 1
+        for w in neighbors:
+            self._lower(w)
+
+    def add_edge(self, u: int, v: int) -> None:
+        """Inserts edge uv, recoloring the endpoint of smaller degree when
+        both have the same color.
+        """
+        self._check_vertex(u)
+        self._check_vertex(v)
+        if u == v:
+            raise ValueError(f"Self loop at vertex {u}")
+        if v in self._adjacency[u]:
+            return
+        self._adjacency[u].add(v)
+        self._adjacency[v].add(u)
+        if self._colors[u] == self._colors[v]:
+            if len(self._adjacency[u]) < len(self._adjacency[v]):
+                u, v = v, u
+            self._set_color(v, -1)
+            self._repair(v)
+
+    def remove_edge(self, u: int, v: int) -> None:
+        """Deletes edge uv, its endpoints may move to smaller colors."""
+        self._check_vertex(u)
+        self._check_vertex(v)
+        if v not in self._adjacency[u]:
+            raise ValueError(f"There is no edge between {u} and {v}")
+        self._adjacency[u].discard(v)
+        self._adjacency[v].discard(u)
+        self._lower(u)
+        self._lower(v)
+
+    def _check_vertex(self, v: int) -> None:
+        if not self.has_vertex(v):
+            raise ValueError(f"There is no vertex {v}")
+
+    def _set_color(self, v: int, color: int) -> None:
+        counts = self._counts
+        old = self._colors[v]
+        if old >= 0:
+            counts[old] -= 1
+            if not counts[old]:
+                self._number_of_colors -= 1
+        if color >= 0:
+            if color >= len(counts):
+                counts.extend([0] * (color + 1 - len(counts)))
+            if not counts[color]:
+                self._number_of_colors += 1
+            counts[color] += 1
+        self._colors[v] = color
+
+    def _smallest_free_color(self, v: int) -> int:
+        colors = self._colors
+        used = {colors[w] for w in self._adjacency[v]}
+        color = 0
+        while color in used:
+            color += 1
+        return color
+
+    def _lower(self, v: int) -> None:
+        """Moves v to the smallest color free among its neighbors, unless
+        that would use one more color while the color of v is at most its
+        degree.
+        """
+        color = self._smallest_free_color(v)
+        old = self._colors[v]
+        counts = self._counts
+        if color < old and (
+            counts[color] or counts[old] == 1 or old > len(self._adjacency[v])
+        ):
+            self._set_color(v, color)
+
+    def _repair(self, v: int) -> None:
+        """Colors the uncolored vertex v, with a Kempe chain swap when the
+        smallest free color is not used yet.
+        """
+        color = self._smallest_free_color(v)
+        if color < len(self._counts) and self._counts[color]:
+            self._set_color(v, color)
+            return
+
+        colors = self._colors
+        by_color: dict[int, List[int]] = {}
+        for w in self._adjacency[v]:
+            by_color.setdefault(colors[w], []).append(w)
+        palette = [c for c, count in enumerate(self._counts) if count]
+        # colors blocked by few neighbors are the easiest to free, colors
+        # larger than the degree of v are not taken
+        degree = len(self._adjacency[v])
+        blocked = [c for c in by_color if c <= degree]
+        for c in sorted(blocked, key=lambda c: len(by_color[c])):
+            for d in palette:
+                if d != c and self._swap_kempe_chain(v, by_color[c], c, d):
+                    self._set_color(v, c)
+                    return
+        self._set_color(v, color)
+
+    def _swap_kempe_chain(self, v: int, blocking: List[int], c: int, d: int) -> bool:
+        """Swaps colors c and d on the Kempe chain through the neighbors of
+        v colored c, when that frees c for v: the chain has to hold all of
+        them and no neighbor of v colored d, and no vertex of the chain may
+        get a color larger than its degree.
+
+        Returns:
+            Whether the chain was swapped.
+        """
+        colors = self._colors
+        adjacency = self._adjacency
+        chain = [blocking[0]]
+        in_chain = {blocking[0]}
+        head = 0
+        while head < len(chain):
+            x = chain[head]
+            head += 1
+            for y in adjacency[x]:
+                # v is uncolored, so the chain never enters it
+                if y not in in_chain and (colors[y] == c or colors[y] == d):
+                    in_chain.add(y)
+                    chain.append(y)
+                    if len(chain) > self.kempe_chain_limit:
+                        return False
+
+        if not all(w in in_chain for w in blocking):
+            return False
+        if any(colors[w] == d and w in in_chain for w in adjacency[v]):
+            return False
+        if any(
+            (d if colors[x] == c else c) > len(adjacency[x]) for x in chain
+        ):
+            return False
+        for x in chain:
+            self._set_color(x, d if colors[x] == c else c)
+        logger.debug(f"Swapped colors {c} and {d} on {len(chain)} vertices")
+        return True
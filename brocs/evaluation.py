@@ -1,14 +1,26 @@
 import logging
 import time
-from dataclasses import dataclass
-from typing import List
+from array import array
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence, Tuple, Union
 
-import networkx as nx
+import numpy as np
+import pandas as pd
 
 from brocs.algorithms.base import ColoringAlgorithm
-from brocs.helpers import delta, validate_coloring
+from brocs.budget import BudgetExceeded, BudgetToken, RunBudget, cancellable
+from brocs.csr import CSRGraph, GraphLike, PackedGraphs, as_networkx, as_packed
+from brocs.helpers import compact_coloring
+from brocs.instrumentation import Recorder, recording
+from brocs.invariants import invariants_of
+from brocs.memory import bytes_to_human_readable, track_peak_memory
+from brocs.timing import TimingSettings, TimingStatistics, time_calls
 from brocs.visualization import show_colored_graph
 
+if TYPE_CHECKING:
+    from brocs.cache import ResultCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,53 +35,426 @@ def time_ns_to_human_readable(time_ns: int) -> str:
         return f"{time_ns / 1000000000} s"
 
 
+def timing_to_human_readable(timing: TimingStatistics) -> str:
+    low, high = timing.confidence_interval()
+    times = [timing.median, timing.min, timing.p95, timing.stdev, low, high]
+    median, minimum, p95, stdev, low, high = (
+        time_ns_to_human_readable(round(t)) for t in times
+    )
+    return (
+        f"median {median}, min {minimum}, p95 {p95}, stdev {stdev}, "
+        f"95% CI of the mean [{low}, {high}] "
+        f"({len(timing.times)} samples of {timing.loops} calls)"
+    )
+
+
+@dataclass(slots=True)
+class ColoringStatistics:
+    delta: int
+    is_coloring_correct: bool
+    number_of_conflicts: int
+    first_conflict: Optional[Tuple[int, int]]
+    color_counts: np.ndarray
+    uncolored: int
+
+    @property
+    def unique_colors(self) -> int:
+        return int(np.count_nonzero(self.color_counts)) + (self.uncolored > 0)
+
+
+def coloring_statistics(
+    edges: np.ndarray, colors: np.ndarray, delta: Optional[int] = None
+) -> ColoringStatistics:
+    """Evaluates a coloring in a single vectorized pass over the edges.
+
+    Args:
+        edges: Array of shape (m, 2) listing every edge once,
+            as returned by ``CSRGraph.edges``.
+        colors: Color of every vertex, -1 marks an uncolored vertex.
+        delta: Maximal degree of the graph when already known,
+            computed from the edges otherwise.
+
+    Returns:
+        Maximal degree, validity, number of edges joining two vertices of
+        the same color (and the first of them), and the number of vertices
+        in every color class.
+    """
+    colors = np.asarray(colors)
+    number_of_nodes = len(colors)
+
+    if delta is None:
+        degrees = np.bincount(edges.ravel(), minlength=number_of_nodes)
+        delta = int(degrees.max()) if number_of_nodes else 0
+    conflicts = np.flatnonzero(colors[edges[:, 0]] == colors[edges[:, 1]])
+
+    first_conflict = None
+    if len(conflicts):
+        u, v = edges[conflicts[0]]
+        first_conflict = (int(u), int(v))
+
+    is_colored = colors >= 0
+    return ColoringStatistics(
+        delta=delta,
+        is_coloring_correct=not len(conflicts),
+        number_of_conflicts=len(conflicts),
+        first_conflict=first_conflict,
+        color_counts=np.bincount(colors[is_colored]),
+        uncolored=number_of_nodes - int(np.count_nonzero(is_colored)),
+    )
+
+
 @dataclass(slots=True)
 class EvaluationResults:
-    graph: nx.Graph
+    graph: GraphLike
     number_of_nodes: int
     delta: int
 
     unique_colors: int
     is_coloring_correct: bool
-    coloring: List[int]
+    coloring: np.ndarray
     time_elapsed: int
 
+    number_of_conflicts: int
+    first_conflict: Optional[Tuple[int, int]]
+    color_counts: np.ndarray
+
+    # time of every span in nanoseconds and operation counters of an
+    # instrumented run, see ``brocs.instrumentation``, empty otherwise
+    spans: dict[str, int] = field(default_factory=dict)
+    counters: dict[str, int] = field(default_factory=dict)
+
+    # bytes allocated at the peak of a run with memory tracking, growth of
+    # the resident memory at its peak and size of the graph arrays, None
+    # otherwise
+    peak_memory: Optional[int] = None
+    peak_rss: Optional[int] = None
+    graph_memory: Optional[int] = None
+
+    # times of the samples of a run timed by ``time_calls``, time_elapsed
+    # is then their median
+    timing: Optional[TimingStatistics] = None
+
+    # "time" or "memory" when the run was cancelled over its budget, the
+    # coloring is then left uncolored (-1) and unique_colors is 0
+    budget_exceeded: Optional[str] = None
+
     def visualize_coloring(self):
-        show_colored_graph(self.graph, self.coloring)
+        show_colored_graph(as_networkx(self.graph), self.coloring)
+
+
+@dataclass(slots=True)
+class RepeatedRunsSummary:
+    """Running statistics of repeated runs of an algorithm on a graph.
+
+    Only the best coloring, the result of the last repetition and the time
+    of every run are kept, so memory barely grows with the number of runs.
+    Runs may be added in any order, ties are resolved by the repetition
+    number. Runs over their budget are only counted in exceeded.
+    """
+
+    runs: int = 0
+    exceeded: int = 0
+    total_time: int = 0
+    min_number_of_colors: Optional[int] = None
+    best_coloring: Optional[np.ndarray] = None
+    best_repetition: int = -1
+    last_result: Optional[EvaluationResults] = None
+    last_repetition: int = -1
+    max_peak_memory: Optional[int] = None
+    times: array = field(default_factory=lambda: array("q"))
+
+    def add(self, results: EvaluationResults, repetition: int) -> None:
+        if results.budget_exceeded is not None:
+            self.exceeded += 1
+            return
+        self.runs += 1
+        self.total_time += results.time_elapsed
+        self.times.append(int(results.time_elapsed))
+        if (
+            self.min_number_of_colors is None
+            or results.unique_colors < self.min_number_of_colors
+            or (
+                results.unique_colors == self.min_number_of_colors
+                and repetition < self.best_repetition
+            )
+        ):
+            self.min_number_of_colors = results.unique_colors
+            self.best_coloring = results.coloring
+            self.best_repetition = repetition
+        if repetition > self.last_repetition:
+            self.last_result = results
+            self.last_repetition = repetition
+        if results.peak_memory is not None:
+            self.max_peak_memory = max(
+                self.max_peak_memory or 0, results.peak_memory
+            )
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.runs if self.runs else 0.0
+
+    @property
+    def timing(self) -> Optional[TimingStatistics]:
+        """Statistics of the times of all runs, None before the first."""
+        return TimingStatistics(self.times.tolist()) if self.runs else None
+
+
+def _without_cached_invariants(G: GraphLike) -> GraphLike:
+    """Graph sharing the arrays of G, without the invariants cached for it.
+    Invariants of other graph types are not cached.
+    """
+    if isinstance(G, CSRGraph):
+        return CSRGraph(G.indptr, G.indices)
+    return G
+
+
+def uses_cache(
+    instrument: bool = False,
+    track_memory: bool = False,
+    timing: Optional[TimingSettings] = None,
+    budget: Optional[RunBudget] = None,
+) -> bool:
+    """Whether runs evaluated with these ``evaluate_graph`` options may be
+    looked up in and stored to a result cache. Runs measuring more than the
+    coloring, or stopped by a budget, may not.
+    """
+    return not (instrument or track_memory or timing is not None or budget is not None)
 
 
 def evaluate_graph(
-    G: nx.Graph, coloring_algorithm: ColoringAlgorithm
+    G: GraphLike,
+    coloring_algorithm: ColoringAlgorithm,
+    cache: Optional["ResultCache"] = None,
+    instrument: bool = False,
+    track_memory: bool = False,
+    timing: Optional[TimingSettings] = None,
+    budget: Optional[RunBudget] = None,
 ) -> EvaluationResults:
-    nodes = list(G.nodes())
-    m = len(nodes)
+    """Colors G with the algorithm, then times and checks the coloring.
 
-    start = time.time_ns()
-    colors = coloring_algorithm.color_graph(G)
-    time_elapsed = time.time_ns() - start
+    With a cache, results of a seeded run of the same algorithm on the same
+    graph are looked up instead of recomputed, and stored after a miss.
+    Runs with any of the options below skip the cache, see ``uses_cache``.
+    With instrument, the spans and counters recorded by the algorithm are
+    kept in the results. With track_memory, the peak memory allocated by
+    the algorithm is measured with ``track_peak_memory``. Tracing every
+    allocation slows the algorithm down, so the time of such a run is not
+    comparable with untracked ones.
 
-    unique_colors = len(set(colors))
+    A run is a single timed call, unless timing settings are given. Then
+    calls are timed by ``time_calls`` and time_elapsed is their median,
+    after an extra call giving the spans and memory when they are asked
+    for. Every timed call gets a copy of the graph without its cached
+    invariants, so a sample times the same work as a single call.
 
-    G_delta = delta(G)
-    G_coloring_correct = validate_coloring(G, colors)
+    With a budget, the algorithm is cancelled once all its calls together
+    take longer or grow the memory of the process by more than allowed.
+    The run is then recorded as over its budget instead of raising.
+    """
+    key = None
+    if cache is not None and uses_cache(instrument, track_memory, timing, budget):
+        key = cache.key(G, coloring_algorithm)
+    if key is not None:
+        cached_results = cache.get(key, G)
+        if cached_results is not None:
+            logger.info(f"Using cached results of {coloring_algorithm.name}")
+            return cached_results
+
+    recorder = Recorder()
+    memory = None
+    timing_statistics = None
+    budget_exceeded = None
+    token = BudgetToken(budget) if budget is not None else None
+    try:
+        with cancellable(token) if token is not None else nullcontext():
+            if timing is None or instrument or track_memory:
+                with recording(recorder) if instrument else nullcontext():
+                    tracking = track_peak_memory() if track_memory else nullcontext()
+                    with tracking as memory:
+                        start = time.perf_counter_ns()
+                        colors = coloring_algorithm.color_graph(G)
+                        time_elapsed = time.perf_counter_ns() - start
+            if timing is not None:
+                colors, timing_statistics = time_calls(
+                    coloring_algorithm.color_graph,
+                    timing,
+                    setup=lambda: _without_cached_invariants(G),
+                )
+                time_elapsed = round(timing_statistics.median)
+    except BudgetExceeded as exceeded:
+        budget_exceeded = exceeded.reason
+        time_elapsed = time.perf_counter_ns() - token.start
+        timing_statistics = None
+
+    # graph invariants are cached for CSRGraph inputs
+    invariants = invariants_of(G)
+    edges = invariants.edges
+    if budget_exceeded is not None:
+        logger.warning(
+            f"{coloring_algorithm.name} exceeded its {budget_exceeded} budget "
+            f"after {time_ns_to_human_readable(time_elapsed)}"
+        )
+        colors = compact_coloring(np.full(invariants.number_of_nodes, -1))
+        statistics = ColoringStatistics(
+            delta=invariants.delta,
+            is_coloring_correct=False,
+            number_of_conflicts=0,
+            first_conflict=None,
+            color_counts=np.zeros(0, dtype=np.int64),
+            uncolored=len(colors),
+        )
+    else:
+        colors = compact_coloring(colors)
+        statistics = coloring_statistics(edges, colors, invariants.delta)
 
     logger.info(
-        f"Colored graph G of {G.number_of_nodes()} vertices and {G.number_of_edges()} edges"
+        f"Colored graph G of {len(colors)} vertices and {len(edges)} edges"
     )
-    logger.info(f"with maximum vertex degree of {G_delta}")
+    logger.info(f"with maximum vertex degree of {statistics.delta}")
     logger.info(f"colored using {coloring_algorithm.__class__.__name__}.")
-    logger.info(f"Resulted in a {'NOT' * (not G_coloring_correct)} valid coloring")
+    logger.info(
+        f"Resulted in a {'NOT' * (not statistics.is_coloring_correct)} valid coloring"
+    )
+    if statistics.first_conflict is not None:
+        logger.info(
+            f"{statistics.number_of_conflicts} edges join vertices of the same "
+            f"color, first of them is {statistics.first_conflict}"
+        )
+    unique_colors = statistics.unique_colors if budget_exceeded is None else 0
     logger.info(f"Used {unique_colors} colors")
     logger.info(f"Time elapsed: {time_ns_to_human_readable(time_elapsed)}")
+    if timing_statistics is not None:
+        logger.info(f"Timing: {timing_to_human_readable(timing_statistics)}")
+    for name, span_time in recorder.spans.items():
+        logger.info(f"  {name}: {time_ns_to_human_readable(span_time)}")
+    if recorder.counters:
+        logger.info(f"Counters: {recorder.counters}")
+    graph_memory = None
+    if memory is not None:
+        graph_memory = invariants.csr.nbytes
+        logger.info(
+            f"Memory: {memory}, graph {bytes_to_human_readable(graph_memory)}"
+        )
 
     evaluation_results = EvaluationResults(
         graph=G,
-        number_of_nodes=m,
-        delta=G_delta,
+        number_of_nodes=len(colors),
+        delta=statistics.delta,
         unique_colors=unique_colors,
-        is_coloring_correct=G_coloring_correct,
+        is_coloring_correct=statistics.is_coloring_correct,
         coloring=colors,
         time_elapsed=time_elapsed,
+        number_of_conflicts=statistics.number_of_conflicts,
+        first_conflict=statistics.first_conflict,
+        color_counts=statistics.color_counts,
+        spans=recorder.spans,
+        counters=recorder.counters,
+        peak_memory=memory.peak_traced if memory is not None else None,
+        peak_rss=memory.peak_rss if memory is not None else None,
+        graph_memory=graph_memory,
+        timing=timing_statistics,
+        budget_exceeded=budget_exceeded,
     )
 
+    if key is not None and budget_exceeded is None:
+        cache.put(key, evaluation_results)
     return evaluation_results
+
+
+# columns of the table of evaluate_many, named like the exported results
+BATCH_COLUMNS = (
+    "num_of_vertices",
+    "num_of_edges",
+    "big_delta",
+    "number_of_colors",
+    "is_coloring_correct",
+    "number_of_conflicts",
+)
+
+
+@dataclass(slots=True)
+class BatchEvaluationResults:
+    """Results of coloring many graphs at once.
+
+    Attributes:
+        graphs: The colored graphs, packed.
+        coloring: Colors of all vertices, see ``PackedGraphs.unpack``.
+        time_elapsed: Time of coloring all graphs, in nanoseconds.
+        table: One row of ``BATCH_COLUMNS`` per graph.
+    """
+
+    graphs: PackedGraphs
+    coloring: np.ndarray
+    time_elapsed: int
+    table: pd.DataFrame
+
+    def coloring_of(self, i: int) -> np.ndarray:
+        start, end = self.graphs.offsets[i], self.graphs.offsets[i + 1]
+        return self.coloring[start:end]
+
+
+def _per_graph_max(values: np.ndarray, packed: PackedGraphs) -> np.ndarray:
+    """Maximum of per vertex values over every graph, 0 for empty graphs."""
+    maximum = np.zeros(len(packed), dtype=np.int64)
+    nonempty = np.flatnonzero(packed.sizes)
+    if len(nonempty):
+        maximum[nonempty] = np.maximum.reduceat(values, packed.offsets[nonempty])
+    return maximum
+
+
+def evaluate_many(
+    graphs: Union[PackedGraphs, Iterable[GraphLike]],
+    coloring_algorithm: ColoringAlgorithm,
+    names: Optional[Sequence[str]] = None,
+) -> BatchEvaluationResults:
+    """Colors many graphs with ``color_many`` and checks all colorings with
+    array operations over the packed union, without per graph setup.
+
+    Args:
+        graphs: Graphs to color, or ``PackedGraphs`` holding them.
+        coloring_algorithm: Algorithm to evaluate.
+        names: Index of the result table, graph numbers by default.
+    """
+    packed = as_packed(graphs)
+
+    start = time.time_ns()
+    colors = coloring_algorithm.color_many(packed)
+    time_elapsed = time.time_ns() - start
+    colors = compact_coloring(colors)
+
+    union = packed.graph
+    edges = union.edges()
+    edge_graphs = packed.labels[edges[:, 0]]
+    is_conflict = colors[edges[:, 0]] == colors[edges[:, 1]]
+    conflicts = np.bincount(edge_graphs[is_conflict], minlength=len(packed))
+
+    # distinct (graph, color) pairs, -1 of uncolored vertices counts as a color
+    shifted = colors.astype(np.int64) + 1
+    stride = int(shifted.max(initial=0)) + 1
+    pairs = np.unique(packed.labels * stride + shifted)
+    number_of_colors = np.bincount(pairs // stride, minlength=len(packed))
+
+    table = pd.DataFrame(
+        {
+            "num_of_vertices": packed.sizes,
+            "num_of_edges": np.bincount(edge_graphs, minlength=len(packed)),
+            "big_delta": _per_graph_max(union.degrees, packed),
+            "number_of_colors": number_of_colors,
+            "is_coloring_correct": conflicts == 0,
+            "number_of_conflicts": conflicts,
+        },
+        index=pd.Index(names, name="graph_name") if names is not None else None,
+    )
+
+    logger.info(
+        f"Colored {len(packed)} graphs of {union.number_of_nodes()} vertices "
+        f"and {len(edges)} edges in total with {coloring_algorithm.name} "
+        f"in {time_ns_to_human_readable(time_elapsed)}, "
+        f"{int(np.count_nonzero(conflicts))} colorings are not valid"
+    )
+    return BatchEvaluationResults(
+        graphs=packed,
+        coloring=colors,
+        time_elapsed=time_elapsed,
+        table=table,
+    )
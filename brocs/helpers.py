@@ -8,12 +8,19 @@ Connected sequential algorithm
 """
 
 import logging
-from typing import List, Optional, Set, Tuple
+from typing import Optional, Sequence
 
 import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from brocs.csr import INDEX_DTYPE, GraphLike, as_csr
 
 logger = logging.getLogger("main")
 
+COLORING_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+SIGNED_COLORING_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
 
 def check_graph(graph: nx.Graph):
     nodes = set(graph.nodes())
@@ -23,79 +30,100 @@ def check_graph(graph: nx.Graph):
     ), "Graph should have nodes labeled from 0 to n-1"
 
 
-def delta(G: nx.Graph) -> int:
+def delta(G: GraphLike) -> int:
     """
     Returns:
         Delta of G - the maximal degree of verticies
     """
-    nodes = list(G.nodes())
-    m = len(nodes)
-    if m <= 0:
+    degrees = as_csr(G).degrees
+    if len(degrees) <= 0:
         return 0
 
-    delta = len(list(G.neighbors(nodes[0])))
-    v = 0
-
-    for node in nodes:
-        number_of_neighbors = len(list(G.neighbors(node)))
-        if number_of_neighbors > delta:
-            delta = number_of_neighbors
-            v = node
+    v = int(np.argmax(degrees))
+    delta = int(degrees[v])
 
     logger.debug(f"The greatest degree has vertex number {v}.")
     logger.debug(f"It has degree of {delta}")
     return delta
 
 
-def validate_coloring(G: nx.Graph, colors: List[int]) -> bool:
-    nodes = list(G.nodes())
-
-    for v in nodes:
-        for neighbor in list(G.neighbors(v)):
-            if colors[neighbor] == colors[v]:
-                return False
-    return True
+def compact_coloring(colors: Sequence[int]) -> np.ndarray:
+    """Coloring as an array of the smallest integer dtype holding its colors.
 
+    Colorings use at most Delta + 1 colors, so uint8 or uint16 is usually
+    enough, instead of a 28 byte Python int per vertex. A signed dtype is
+    used when some vertex is left uncolored (-1).
+    """
+    colors = np.asarray(colors)
+    if not len(colors):
+        return colors.astype(np.uint8)
+    smallest, largest = int(colors.min()), int(colors.max())
+    dtypes = COLORING_DTYPES if smallest >= 0 else SIGNED_COLORING_DTYPES
+    for dtype in dtypes:
+        if largest <= np.iinfo(dtype).max:
+            return colors.astype(dtype, copy=False)
+    return colors.astype(np.int64, copy=False)
+
+
+def validate_coloring(G: GraphLike, colors: Sequence[int]) -> bool:
+    """Checks all edges at once, no edge may join two vertices of one color."""
+    edges = as_csr(G).edges()
+    colors = np.asarray(colors)
+    return not np.any(colors[edges[:, 0]] == colors[edges[:, 1]])
+
+
+def find_common_neighbor(G: GraphLike, a: int, b: int) -> int:
+    """Find a vertex adjacent to both a and b, the first one in the
+    adjacency list of a.
+    """
+    csr = as_csr(G)
+    a_neighbors = csr.neighbors(a)
 
-def find_common_neighbor(G: nx.Graph, a: int, b: int):
-    a_neighbors = G.neighbors(a)
-    b_neighbors = G.neighbors(b)
-
-    common_neighbors = list(set(a_neighbors) & set(b_neighbors))
+    common_neighbors = a_neighbors[np.isin(a_neighbors, csr.neighbors(b))]
 
-    if not common_neighbors:
+    if not len(common_neighbors):
         raise ValueError("wrong input")
 
-    return common_neighbors[0]
+    return int(common_neighbors[0])
 
 
-def dist_two(G: nx.Graph) -> Set[Tuple[int, int]]:
+def dist_two(G: GraphLike) -> np.ndarray:
     """Find all pairs of vertices of distance 2 between them.
-    Might improve one day with a laplacian matrix
+
+    Pairs are the nonzero entries above the diagonal of A^2 with the edges
+    of A masked out, computed with a single sparse product.
+
+    Returns:
+        Array of shape (k, 2) of pairs (u, v) with u < v, sorted
+        lexicographically.
     """
-    dist_two_set = set()
-    for v in G.nodes():
-        v_neighbors = list(G.neighbors(v))  # take all neighbors of v
-        for v_neighbor in v_neighbors:
-            for second_neighbor in G.neighbors(v_neighbor):
-                if second_neighbor != v and second_neighbor not in v_neighbors:
-                    if second_neighbor <= v:
-                        dist_two_set.add((second_neighbor, v))
-                    if second_neighbor > v:
-                        dist_two_set.add((v, second_neighbor))
-
-    return dist_two_set
-
-
-def dist_two_from(G: nx.Graph, a: int) -> Optional[int]:
-    """Find any vetrex of distance 2 from vetrex a
-    Also might improve with laplacian matrix
+    A = as_csr(G).to_scipy()
+    A2 = sparse.triu(A @ A, k=1, format="csr")
+
+    # drop the pairs that are adjacent, they are at distance one
+    A2 = A2 - A2.multiply(A)
+    A2.eliminate_zeros()
+    A2 = A2.tocoo()
+
+    pairs = np.stack((A2.row, A2.col), axis=1).astype(INDEX_DTYPE)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def dist_two_from(G: GraphLike, a: int) -> Optional[int]:
+    """Find any vetrex of distance 2 from vetrex a.
+    Looks through all neighbors of neighbors of a at once and returns
+    the first one, in adjacency order, that is neither a nor its neighbor.
     """
-    a_neighbors = list(G.neighbors(a))
+    csr = as_csr(G)
+    a_neighbors = csr.neighbors(a)
+
+    is_close = np.zeros(csr.number_of_nodes(), dtype=bool)
+    is_close[a_neighbors] = True
+    is_close[a] = True
 
-    for v in a_neighbors:
-        for second_neighbor in G.neighbors(v):
-            if second_neighbor != a and second_neighbor not in a_neighbors:
-                return second_neighbor
+    second_neighbors = csr.gather(a_neighbors)
+    candidates = second_neighbors[~is_close[second_neighbors]]
 
-    return None
+    if not len(candidates):
+        return None
+    return int(candidates[0])
@@ -0,0 +1,77 @@
+"""
+Named spans and operation counters recorded by the coloring algorithms.
+
+Algorithms record into the recorder of the current context, which is
+a ``NullRecorder`` unless a run is wrapped in ``recording``. Its ``span``
+returns one shared no-op context manager and its ``count`` does nothing,
+so a disabled recorder costs a function call per span and no counters
+are computed at all, code computing them checks ``enabled`` first.
+
+Spans nest, the time of a span includes the spans opened inside it.
+Subgraphs colored in worker processes (``jobs`` > 1) are not recorded.
+"""
+
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Iterator
+
+_NO_SPAN = nullcontext()
+
+
+class NullRecorder:
+    """Recorder of runs without instrumentation, drops everything."""
+
+    enabled = False
+
+    def span(self, name: str) -> ContextManager:
+        return _NO_SPAN
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+
+class Recorder(NullRecorder):
+    """Total time and number of entries of every span, in nanoseconds, and
+    totals of every counter.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.spans: dict[str, int] = {}
+        self.span_calls: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            self.spans[name] = self.spans.get(name, 0) + elapsed
+            self.span_calls[name] = self.span_calls.get(name, 0) + 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + int(amount)
+
+
+_current: ContextVar[NullRecorder] = ContextVar(
+    "brocs_recorder", default=NullRecorder()
+)
+
+
+def current_recorder() -> NullRecorder:
+    """Recorder algorithms record into, a ``NullRecorder`` by default."""
+    return _current.get()
+
+
+@contextmanager
+def recording(recorder: NullRecorder) -> Iterator[NullRecorder]:
+    """Makes recorder the current one inside the ``with`` block."""
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
@@ -0,0 +1,139 @@
+"""
+Cache of graph properties that do not depend on the coloring algorithm.
+
+A ``CSRGraph`` is immutable, so its invariants are computed at most once
+and shared by every algorithm run and evaluation of the same graph object.
+"""
+
+import hashlib
+import weakref
+from functools import cached_property
+from typing import List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+from scipy.sparse.csgraph import connected_components
+
+from brocs.csr import CSRGraph, GraphLike, as_csr, as_networkx
+from brocs.helpers import dist_two
+from brocs.traversal import BlockDecomposition, block_decomposition
+
+_cache: "weakref.WeakKeyDictionary[CSRGraph, GraphInvariants]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class GraphInvariants:
+    """Lazily computed properties of a graph, each filled on first access.
+
+    Args:
+        csr: Graph in the CSR form.
+        source: Graph the CSR form was built from, if it was a networkx
+            graph. Saves a copy when a networkx view is needed.
+    """
+
+    def __init__(self, csr: CSRGraph, source: Optional[nx.Graph] = None) -> None:
+        self.csr = csr
+        self._source = source
+
+    def assume_connected(self) -> "GraphInvariants":
+        """Records that the graph is known to be connected, like a split off
+        component, so no search is needed to check it.
+        """
+        # cached_property reads the instance dict first
+        self.__dict__["is_connected"] = True
+        return self
+
+    @cached_property
+    def number_of_nodes(self) -> int:
+        return self.csr.number_of_nodes()
+
+    @cached_property
+    def number_of_edges(self) -> int:
+        return self.csr.number_of_edges()
+
+    @cached_property
+    def degrees(self) -> np.ndarray:
+        return self.csr.degrees
+
+    @cached_property
+    def delta(self) -> int:
+        return int(self.degrees.max()) if self.number_of_nodes else 0
+
+    @cached_property
+    def edges(self) -> np.ndarray:
+        return self.csr.edges()
+
+    @cached_property
+    def blocks(self) -> BlockDecomposition:
+        return block_decomposition(self.csr)
+
+    @cached_property
+    def components(self) -> Tuple[int, np.ndarray]:
+        """Number of connected components and the component of every vertex."""
+        number, labels = connected_components(self.csr.to_scipy(), directed=False)
+        return number, labels
+
+    @cached_property
+    def is_connected(self) -> bool:
+        return self.components[0] <= 1
+
+    @cached_property
+    def articulation_points(self) -> np.ndarray:
+        return self.blocks.articulation_points
+
+    @cached_property
+    def dist_two(self) -> np.ndarray:
+        return dist_two(self.csr)
+
+    @cached_property
+    def is_complete(self) -> bool:
+        n = self.number_of_nodes
+        return self.number_of_edges == n * (n - 1) // 2
+
+    @cached_property
+    def is_cycle(self) -> bool:
+        return (
+            self.number_of_nodes >= 3
+            and self.is_connected
+            and bool(np.all(self.degrees == 2))
+        )
+
+    @cached_property
+    def digest(self) -> str:
+        """sha256 of the CSR arrays. Adjacency order is part of the content,
+        as the colorings found by the algorithms depend on it.
+        """
+        sha = hashlib.sha256()
+        sha.update(np.int64(self.number_of_nodes).tobytes())
+        sha.update(np.ascontiguousarray(self.csr.indptr, dtype=np.int64).tobytes())
+        sha.update(np.ascontiguousarray(self.csr.indices, dtype=np.int32).tobytes())
+        return sha.hexdigest()
+
+    @cached_property
+    def networkx(self) -> nx.Graph:
+        """networkx form of the graph with nodes labeled from 0 to n-1."""
+        if self._source is not None:
+            return as_networkx(self._source)
+        return self.csr.to_networkx()
+
+    @cached_property
+    def cycle(self) -> Optional[List[Tuple[int, int, str]]]:
+        """Cycle found by ``nx.find_cycle``, None for a forest."""
+        try:
+            return nx.find_cycle(self.networkx, orientation="ignore")
+        except nx.NetworkXNoCycle:
+            return None
+
+
+def invariants_of(G: GraphLike) -> GraphInvariants:
+    """Invariants of a graph. For a ``CSRGraph`` the same cached object is
+    returned on every call, other (mutable) graph types get a fresh one.
+    """
+    if isinstance(G, CSRGraph):
+        invariants = _cache.get(G)
+        if invariants is None:
+            invariants = _cache[G] = GraphInvariants(G)
+        return invariants
+    source = G if isinstance(G, nx.Graph) else None
+    return GraphInvariants(as_csr(G), source)
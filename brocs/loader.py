@@ -0,0 +1,332 @@
+import json
+import logging
+import re
+import struct
+import warnings
+import zipfile
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple
+
+import numpy as np
+
+from brocs.csr import INDEX_DTYPE, CSRGraph
+from brocs.memory import MemoryUsage, track_peak_memory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_BYTES = 64 * 1024**2
+
+DEFAULT_CHUNK_BYTES = 4 * 1024**2
+
+CSR_FORMAT = "brocs-csr"
+CSR_FORMAT_VERSION = 1
+
+DIMACS_SUFFIXES = (".col",)
+EDGE_LIST_SUFFIXES = (".edges", ".edgelist")
+GRAPH_FILE_SUFFIXES = (".npy", ".npz") + DIMACS_SUFFIXES + EDGE_LIST_SUFFIXES
+
+_DIMACS_PROBLEM_LINE = re.compile(rb"^p[ \t]+\S+[ \t]+(\d+)", re.MULTILINE)
+_DIMACS_NON_EDGE_LINE = re.compile(rb"^(?!e[ \t]).*\n", re.MULTILINE)
+_COMMENT_LINE = re.compile(rb"^[ \t]*[#%].*\n", re.MULTILINE)
+_LEADING_BLANKS = re.compile(rb"^[ \t]+", re.MULTILINE)
+_WHITESPACE = np.frombuffer(b" \t\r\n", dtype=np.uint8)
+
+
+def load_npy_mmap(
+    file: Path, block_bytes: int = DEFAULT_BLOCK_BYTES
+) -> Tuple[CSRGraph, MemoryUsage]:
+    """Loads a dense adjacency matrix stored in a .npy file as a ``CSRGraph``.
+
+    The file is memory mapped and scanned in blocks of rows of about
+    ``block_bytes`` bytes, so the full matrix is never held in memory and
+    no networkx graph (with its per-edge attribute dicts) is created.
+    Any nonzero entry is an edge, like in ``nx.from_numpy_array``.
+
+    Returns:
+        Loaded graph and the peak memory used while loading it.
+
+    Raises:
+        ValueError: When the file does not hold a square numeric matrix.
+    """
+    with track_peak_memory() as memory:
+        matrix = np.load(file, mmap_mode="r")
+        if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError(f"File {file} is not a square matrix")
+
+        number_of_nodes = matrix.shape[0]
+        row_bytes = max(number_of_nodes * matrix.itemsize, 1)
+        block_rows = max(block_bytes // row_bytes, 1)
+
+        lower_ends, upper_ends = [], []
+        for start in range(0, number_of_nodes, block_rows):
+            rows, cols = np.nonzero(matrix[start : start + block_rows])
+            rows += start
+            lower_ends.append(np.minimum(rows, cols).astype(INDEX_DTYPE))
+            upper_ends.append(np.maximum(rows, cols).astype(INDEX_DTYPE))
+        del matrix
+
+        u = np.concatenate(lower_ends) if lower_ends else np.empty(0, INDEX_DTYPE)
+        del lower_ends
+        v = np.concatenate(upper_ends) if upper_ends else np.empty(0, INDEX_DTYPE)
+        del upper_ends
+        graph = CSRGraph.from_edges(number_of_nodes, u, v)
+
+    logger.info(
+        f"Loaded {file} with {graph.number_of_nodes()} vertices and "
+        f"{graph.number_of_edges()} edges, {memory}"
+    )
+    return graph, memory
+
+
+def save_csr(
+    file: Path, graph: CSRGraph, metadata: Optional[dict[str, Any]] = None
+) -> None:
+    """Saves a graph in the native brocs format.
+
+    The format is an uncompressed .npz archive with the ``indptr`` and int32
+    ``indices`` arrays, the number of vertices and a JSON header holding the
+    format version and optional user metadata. Uncompressed members can be
+    memory mapped straight from the archive by ``load_csr``.
+    """
+    header = {
+        "format": CSR_FORMAT,
+        "version": CSR_FORMAT_VERSION,
+        "metadata": metadata or {},
+    }
+    np.savez(
+        file,
+        indptr=graph.indptr,
+        indices=graph.indices,
+        number_of_nodes=np.int64(graph.number_of_nodes()),
+        header=np.array(json.dumps(header)),
+    )
+
+
+def _memmap_npz_member(file: Path, archive: zipfile.ZipFile, name: str):
+    """Memory maps an uncompressed array stored in a .npz archive,
+    returns None when the member is compressed.
+    """
+    info = archive.getinfo(f"{name}.npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(file, "rb") as f:
+        # local file header: 30 fixed bytes, then file name and extra field
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = struct.unpack("<HH", f.read(4))
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+
+    if dtype.hasobject or fortran_order:
+        return None
+    if not np.prod(shape):
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(file, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+
+def load_csr(file: Path, mmap: bool = True) -> Tuple[CSRGraph, dict[str, Any]]:
+    """Loads a graph saved with ``save_csr``.
+
+    Args:
+        file: Path to the .npz file.
+        mmap: Memory map the index arrays instead of reading them.
+
+    Returns:
+        Loaded graph and the metadata stored with it.
+
+    Raises:
+        ValueError: When the file is not in the brocs format.
+    """
+    with np.load(file, allow_pickle=False) as archive:
+        if "header" not in archive.files:
+            raise ValueError(f"File {file} is not a brocs graph file")
+        header = json.loads(str(archive["header"]))
+        if header.get("format") != CSR_FORMAT:
+            raise ValueError(f"File {file} is not a brocs graph file")
+        if header.get("version", 0) > CSR_FORMAT_VERSION:
+            raise ValueError(
+                f"File {file} has format version {header['version']}, "
+                f"only versions up to {CSR_FORMAT_VERSION} are supported"
+            )
+        number_of_nodes = int(archive["number_of_nodes"])
+
+        arrays = {}
+        with zipfile.ZipFile(file) as zip_archive:
+            for name in ("indptr", "indices"):
+                array = _memmap_npz_member(file, zip_archive, name) if mmap else None
+                arrays[name] = array if array is not None else archive[name]
+
+    if len(arrays["indptr"]) != number_of_nodes + 1:
+        raise ValueError(f"File {file} has inconsistent vertex count")
+
+    graph = CSRGraph(arrays["indptr"], arrays["indices"])
+    return graph, header["metadata"]
+
+
+def convert_directory(
+    source: Path, destination: Path, block_bytes: int = DEFAULT_BLOCK_BYTES
+) -> int:
+    """Converts dense .npy adjacency matrices to the native brocs format.
+
+    Args:
+        source: A .npy file or a directory with .npy files.
+        destination: Directory for the converted .npz files.
+
+    Returns:
+        Number of converted files.
+    """
+    files = [source] if source.is_file() else sorted(source.glob("*.npy"))
+    destination.mkdir(parents=True, exist_ok=True)
+
+    converted = 0
+    for file in files:
+        target = destination / f"{file.stem}.npz"
+        if target.exists():
+            logger.warning(f"File {target} already exists, skipping")
+            continue
+        try:
+            graph, _ = load_npy_mmap(file, block_bytes)
+        except ValueError as error:
+            logger.error(f"{error}. Skipping...")
+            continue
+        save_csr(target, graph, metadata={"source": file.name})
+        converted += 1
+    return converted
+
+
+def _read_line_chunks(file: Path, chunk_bytes: int) -> Iterator[bytes]:
+    """Reads a text file in chunks of about ``chunk_bytes`` bytes,
+    every chunk ends with a full line.
+    """
+    with open(file, "rb") as f:
+        rest = b""
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                if rest.strip():
+                    yield rest + b"\n"
+                return
+            data = rest + data
+            cut = data.rfind(b"\n") + 1
+            rest = data[cut:]
+            if cut:
+                yield data[:cut]
+
+
+def _parse_numbers(text: bytes, dtype, file: Path) -> np.ndarray:
+    """Parses whitespace separated numbers in a single C-level pass."""
+    # NumPy reads a single 0 from text with nothing but blanks
+    if not text.strip():
+        return np.empty(0, dtype=dtype)
+    with warnings.catch_warnings():
+        # older NumPy versions only warn about unparsable data
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(text, dtype=dtype, sep=" ")
+        except (ValueError, DeprecationWarning):
+            raise ValueError(f"File {file} has malformed lines") from None
+
+
+def _values_per_line(chunk: bytes) -> np.ndarray:
+    """Number of whitespace separated values on every line of chunk, which
+    ends with a full line. Counts only where values start, so it takes
+    memory like the parsed values, not like the text.
+    """
+    text = np.frombuffer(chunk, dtype=np.uint8)
+    is_blank = np.isin(text, _WHITESPACE)
+    starts = np.flatnonzero(~is_blank[1:] & is_blank[:-1]) + 1
+    if len(text) and not is_blank[0]:
+        starts = np.concatenate(([0], starts))
+    line_ends = np.flatnonzero(text == ord("\n"))
+    return np.bincount(
+        np.searchsorted(line_ends, starts), minlength=len(line_ends)
+    )
+
+
+def load_dimacs(file: Path, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> CSRGraph:
+    """Loads a graph in the DIMACS .col format straight into a ``CSRGraph``.
+
+    Lines ``e u v`` are edges with vertices numbered from 1, the number of
+    vertices comes from the ``p edge n m`` line, other lines are ignored.
+    Blanks at the start of a line are skipped.
+    The file is parsed in chunks, every chunk with one regex pass and one
+    vectorized number parse.
+
+    Raises:
+        ValueError: When the file is malformed.
+    """
+    number_of_nodes = None
+    lower_ends, upper_ends = [], []
+    for chunk in _read_line_chunks(file, chunk_bytes):
+        edge_lines = chunk.count(b"\ne") + chunk.startswith(b"e")
+        if edge_lines != chunk.count(b"\n"):
+            chunk = _LEADING_BLANKS.sub(b"", chunk)
+            edge_lines = chunk.count(b"\ne") + chunk.startswith(b"e")
+            problem_line = _DIMACS_PROBLEM_LINE.search(chunk)
+            if problem_line is not None:
+                number_of_nodes = int(problem_line.group(1))
+            chunk = _DIMACS_NON_EDGE_LINE.sub(b"", chunk)
+
+        values = _parse_numbers(chunk.replace(b"e", b" "), np.int64, file)
+        if len(values) != 2 * edge_lines:
+            raise ValueError(f"File {file} has malformed edge lines")
+        values -= 1
+        lower_ends.append(values[0::2].astype(INDEX_DTYPE))
+        upper_ends.append(values[1::2].astype(INDEX_DTYPE))
+
+    u = np.concatenate(lower_ends) if lower_ends else np.empty(0, INDEX_DTYPE)
+    v = np.concatenate(upper_ends) if upper_ends else np.empty(0, INDEX_DTYPE)
+    largest = int(max(u.max(), v.max())) + 1 if len(u) else 0
+    if number_of_nodes is None:
+        number_of_nodes = largest
+    if largest > number_of_nodes or (len(u) and min(u.min(), v.min()) < 0):
+        raise ValueError(f"File {file} has vertices outside of 1..{number_of_nodes}")
+
+    return CSRGraph.from_edges(number_of_nodes, u, v)
+
+
+def load_edge_list(file: Path, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> CSRGraph:
+    """Loads a whitespace separated edge list straight into a ``CSRGraph``.
+
+    Every line holds two vertex ids, optionally followed by more columns
+    (like weights) which are ignored. Lines starting with # or % are
+    comments. Vertex i of the graph is the i-th smallest id in the file.
+
+    Raises:
+        ValueError: When the file is malformed.
+    """
+    columns = None
+    ends = []
+    for chunk in _read_line_chunks(file, chunk_bytes):
+        if b"#" in chunk or b"%" in chunk:
+            chunk = _COMMENT_LINE.sub(b"", chunk)
+        if columns is None:
+            first_line = next(
+                (line for line in chunk.splitlines() if line.strip()), None
+            )
+            if first_line is None:
+                continue
+            columns = len(first_line.split())
+            if columns < 2:
+                raise ValueError(f"File {file} is not an edge list")
+
+        # extra columns may hold non integer weights
+        dtype = np.int64 if columns == 2 else np.float64
+        values = _parse_numbers(chunk, dtype, file)
+        per_line = _values_per_line(chunk)
+        if np.any((per_line != columns) & (per_line != 0)):
+            raise ValueError(f"File {file} has lines of different length")
+        ends.append(values.reshape(-1, columns)[:, :2].astype(np.int64))
+
+    if not ends:
+        return CSRGraph.from_edges(0, [], [])
+
+    ids, edges = np.unique(np.concatenate(ends), return_inverse=True)
+    edges = edges.reshape(-1, 2)
+    return CSRGraph.from_edges(len(ids), edges[:, 0], edges[:, 1])
@@ -1,26 +1,85 @@
 import argparse
 import logging
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import cached_property, partial
 from pathlib import Path
 from typing import Any, Optional, Protocol
 
 import networkx as nx
 import numpy as np
-import pandas as pd
 
-from brocs.algorithms import BrooksAlgorithm, ColoringAlgorithm, ConnectedSequential
-from brocs.evaluation import evaluate_graph, time_ns_to_human_readable
+from brocs.algorithms import (
+    BrooksAlgorithm,
+    ColoringAlgorithm,
+    ConnectedSequential,
+    LinearBrooksAlgorithm,
+)
+from brocs.algorithms.kernels import BACKENDS
+from brocs.budget import RunBudget
+from brocs.cache import DEFAULT_CACHE_BYTES, ResultCache
+from brocs.csr import CSRGraph, GraphLike, as_csr, as_networkx
+from brocs.evaluation import (
+    RepeatedRunsSummary,
+    evaluate_graph,
+    time_ns_to_human_readable,
+    timing_to_human_readable,
+)
 from brocs.visualization import show_colored_graph, show_graph
-from brocs.helpers import delta
+from brocs.loader import (
+    DIMACS_SUFFIXES,
+    EDGE_LIST_SUFFIXES,
+    GRAPH_FILE_SUFFIXES,
+    convert_directory,
+    load_csr,
+    load_dimacs,
+    load_edge_list,
+    load_npy_mmap,
+)
+from brocs.invariants import GraphInvariants, invariants_of
+from brocs.memory import bytes_to_human_readable, track_peak_memory
+from brocs.parallel import run_repeats_in_parallel, task_seed
+from brocs.store import GRAPH_COLUMNS, RUN_COLUMNS, ResultStore, write_chunks
+from brocs.timing import TimingSettings
 
 logger = logging.getLogger(__name__)
 
 
 class Settings(Protocol):
     input: Path
+    mmap: bool
+    jobs: int
+    pool: str
+    seed: Optional[int]
+    backend: str
+    instrument: bool
+    track_memory: bool
+    timing: bool
+    warmup: int
+    samples: int
+    min_sample_time: float
+    keep_gc: bool
+    time_limit: Optional[float]
+    memory_limit: Optional[int]
+
+
+def load_graph_from_file(file: Path, mmap: bool = False) -> Optional[GraphLike]:
+    try:
+        if file.suffix == ".npz":
+            graph, _ = load_csr(file)
+            return graph
+        if file.suffix in DIMACS_SUFFIXES:
+            return load_dimacs(file)
+        if file.suffix in EDGE_LIST_SUFFIXES:
+            return load_edge_list(file)
+        if mmap:
+            graph, _ = load_npy_mmap(file)
+            return graph
+    except ValueError as error:
+        logger.error(f"{error}. Skipping...")
+        return
 
-
-def load_graph_from_file(file: Path) -> Optional[nx.Graph]:
     loaded_file = np.load(file, allow_pickle=True)
 
     if not isinstance(loaded_file, np.ndarray):
@@ -34,36 +93,100 @@ def load_graph_from_file(file: Path) -> Optional[nx.Graph]:
     return nx.from_numpy_array(loaded_file)
 
 
+def load_graph_from_file_or_skip(file: Path, mmap: bool = False) -> Optional[GraphLike]:
+    """Same as load_graph_from_file, but any error only skips the file,
+    so one broken file does not stop loading of a whole directory.
+    """
+    try:
+        return load_graph_from_file(file, mmap)
+    except Exception as error:
+        logger.error(f"Could not load file {file}: {error!r}. Skipping...")
+        return None
+
+
+POOLS: dict[str, type[Executor]] = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
 @dataclass
 class GraphResults:
-    graph: nx.Graph
+    graph: GraphLike
     results: dict[str, Any] = field(default_factory=dict)
 
+    @cached_property
+    def csr(self) -> CSRGraph:
+        """CSR form of the graph, built once and given to every algorithm."""
+        return as_csr(self.graph)
+
+    @cached_property
+    def invariants(self) -> GraphInvariants:
+        return invariants_of(self.csr)
+
 
 @dataclass
 class Program:
     settings: Settings
     loaded_graphs: dict[str, GraphResults] = field(default_factory=dict)
+    cache: Optional[ResultCache] = None
+    store: ResultStore = field(default_factory=ResultStore)
 
-    def load_graphs_from_path(self, path: Path) -> dict[str, nx.Graph]:
+    def load_graphs_from_path(self, path: Path) -> dict[str, GraphLike]:
+        mmap = getattr(self.settings, "mmap", False)
         new_graphs = {}
         if path.is_dir():
             logger.info(f"Loading graphs from directory {path}")
-            # Iterate over files that are numpy files
-            input_file_list = list(path.glob("*.npy"))
-            logger.info(f"Found {len(input_file_list)} npy files in directory {path}")
+            # Iterate over files in one of the supported graph formats
+            input_file_list = sorted(
+                file
+                for suffix in GRAPH_FILE_SUFFIXES
+                for file in path.glob(f"*{suffix}")
+            )
+            # graphs are named by the file stem, a matrix converted by
+            # brocs convert next to its .npy file is loaded only once
+            converted = {file.stem for file in input_file_list if file.suffix == ".npz"}
             for file in input_file_list:
-                graph = load_graph_from_file(file)
+                if file.suffix == ".npy" and file.stem in converted:
+                    logger.warning(f"Skipping {file}, loading {file.stem}.npz instead")
+            input_file_list = [
+                file
+                for file in input_file_list
+                if file.suffix != ".npy" or file.stem not in converted
+            ]
+            logger.info(f"Found {len(input_file_list)} graph files in directory {path}")
+            for file, graph in zip(input_file_list, self.load_files(input_file_list)):
                 if graph is not None:
                     new_graphs.update({file.stem: graph})
         elif path.is_file():
-            graph = load_graph_from_file(path)
+            graph = load_graph_from_file(path, mmap)
             if graph is not None:
                 new_graphs.update({path.stem: graph})
         return new_graphs
 
+    def load_files(self, files: list[Path]) -> list[Optional[GraphLike]]:
+        """Loads files with a pool of workers (settings.jobs, settings.pool).
+        Results come in the order of the files, whatever order the workers
+        finish in.
+        """
+        mmap = getattr(self.settings, "mmap", False)
+        jobs = getattr(self.settings, "jobs", 1)
+        load = partial(load_graph_from_file_or_skip, mmap=mmap)
+
+        if jobs <= 1 or len(files) <= 1:
+            return list(map(load, files))
+
+        pool = POOLS[getattr(self.settings, "pool", "thread")]
+        graphs = []
+        with pool(max_workers=jobs) as executor:
+            for graph in executor.map(load, files):
+                graphs.append(graph)
+                print(f"  Loaded {len(graphs)}/{len(files)} files", end="\r")
+        print()
+        return graphs
+
     def cast_graphs_to_graph_results(
-        self, graphs: dict[str, nx.Graph]
+        self, graphs: dict[str, GraphLike]
     ) -> dict[str, GraphResults]:
         graph_results = {}
         for graph_name, graph in graphs.items():
@@ -81,8 +204,16 @@ class Program:
                 return
             exit(1)
 
-        new_graphs = self.load_graphs_from_path(path)
-        self.loaded_graphs.update(self.cast_graphs_to_graph_results(new_graphs))
+        if getattr(self.settings, "mmap", False):
+            with track_peak_memory() as memory:
+                new_graphs = self.load_graphs_from_path(path)
+            print(f"Memory used while loading: {memory}")
+        else:
+            new_graphs = self.load_graphs_from_path(path)
+        new_graph_results = self.cast_graphs_to_graph_results(new_graphs)
+        for graph_name, graph_results in new_graph_results.items():
+            self.store.add_graph(graph_name, graph_results.invariants)
+        self.loaded_graphs.update(new_graph_results)
         print(f"Loaded {len(new_graphs)} new graphs")
         print(f"Total number of graphs: {len(self.loaded_graphs)}")
 
@@ -95,49 +226,66 @@ class Program:
         choice = take_user_input("Which graph do you want to visualize? >>> ", choices)
         choosen_graph = graph_name_list[choice - 1]
 
-        graph = self.loaded_graphs[choosen_graph].graph
+        graph = as_networkx(self.loaded_graphs[choosen_graph].graph)
         results = self.loaded_graphs[choosen_graph].results
 
         print("Possible views of the graph: ")
         print("1. Barebone Graph")
-        choices = [1]
-        if "BrooksAlgorithm" in results:
-            print("2. Last coloring by Brooks Algorithm")
-            choices.append(2)
-            if "best_coloring" in results["BrooksAlgorithm"]:
-                print("3. Best coloring found by Brooks Algorithm")
-                choices.append(3)
-        if "ConnectedSequential" in results:
-            print("4. Last coloring by Connected Sequential Algorithm")
-            choices.append(4)
-            if "best_coloring" in results["ConnectedSequential"]:
-                print("5. Best coloring found by Connected Sequential Algorithm")
-                choices.append(5)
+        colorings = [None]
+        for alg_name, alg_results in results.items():
+            colorings.append(alg_results["last_result"].coloring)
+            print(f"{len(colorings)}. Last coloring by {alg_name}")
+            if "best_coloring" in alg_results:
+                colorings.append(alg_results["best_coloring"])
+                print(f"{len(colorings)}. Best coloring found by {alg_name}")
+        choices = list(range(1, len(colorings) + 1))
         choice = take_user_input("Which view do you pick? >>> ", choices)
 
         if choice == 1:
             show_graph(graph)
-        elif choice == 2:
-            show_colored_graph(
-                graph, results["BrooksAlgorithm"]["last_result"].coloring
-            )
-        elif choice == 3:
-            show_colored_graph(graph, results["BrooksAlgorithm"]["best_coloring"])
-        elif choice == 4:
-            show_colored_graph(
-                graph, results["ConnectedSequential"]["last_result"].coloring
-            )
-        elif choice == 5:
-            show_colored_graph(graph, results["ConnectedSequential"]["best_coloring"])
+        else:
+            show_colored_graph(graph, colorings[choice - 1])
+
+    def evaluate_options(self) -> dict[str, Any]:
+        """Keyword arguments of ``evaluate_graph`` chosen in the settings."""
+        return {
+            "instrument": getattr(self.settings, "instrument", False),
+            "track_memory": getattr(self.settings, "track_memory", False),
+            "timing": self.timing_settings(),
+            "budget": self.run_budget(),
+        }
+
+    def run_budget(self) -> Optional[RunBudget]:
+        time_limit = getattr(self.settings, "time_limit", None)
+        memory_limit = getattr(self.settings, "memory_limit", None)
+        if time_limit is None and memory_limit is None:
+            return None
+        return RunBudget(
+            time_limit=round(time_limit * 1e9) if time_limit is not None else None,
+            memory_limit=memory_limit * 1024**2 if memory_limit is not None else None,
+        )
+
+    def timing_settings(self) -> Optional[TimingSettings]:
+        if not getattr(self.settings, "timing", False):
+            return None
+        return TimingSettings(
+            warmup=self.settings.warmup,
+            samples=self.settings.samples,
+            min_sample_time=round(self.settings.min_sample_time * 1e6),
+            disable_gc=not self.settings.keep_gc,
+        )
 
     def run_algorith_on_loaded_graphs(
         self, algorithm: ColoringAlgorithm, repeat: Optional[int] = None
     ):
+        options = self.evaluate_options()
         if repeat is None:
             for graph_name, graph_results in self.loaded_graphs.items():
                 alg_name = algorithm.name
                 print(f"\n  Running {algorithm.name} on graph: {graph_name}")
-                new_results = evaluate_graph(graph_results.graph, algorithm)
+                new_results = evaluate_graph(
+                    graph_results.csr, algorithm, self.cache, **options
+                )
                 graph_results.results.update({alg_name: {"last_result": new_results}})
                 time_str = time_ns_to_human_readable(new_results.time_elapsed)
                 print(
@@ -145,139 +293,179 @@ class Program:
                 )
             return
 
-        alg_name = algorithm.name
-        for graph_name, graph_results in self.loaded_graphs.items():
-            # df results (graph_name, alg_name, time, number_of_colors, coloring)
-            all_results = []
-            new_results = None
+        jobs = getattr(self.settings, "jobs", 1)
+        if jobs > 1:
+            self.run_algorithms_in_parallel([algorithm], repeat, jobs)
+            return
 
+        base_seed = getattr(self.settings, "seed", None)
+        for graph_name, graph_results in self.loaded_graphs.items():
             print(f"\n  Running {algorithm.name} on graph: {graph_name} {repeat} times")
-            for _ in range(repeat):
-                new_results = evaluate_graph(graph_results.graph, algorithm)
-                all_results.append(
-                    (
-                        graph_name,
-                        alg_name,
-                        new_results.time_elapsed,
-                        new_results.unique_colors,
-                        new_results.coloring,
+            summary = RepeatedRunsSummary()
+            for repetition in range(repeat):
+                # same seeds as the parallel runner, so --jobs does not
+                # change the colorings of a seeded run
+                seeded = algorithm
+                if base_seed is not None:
+                    seeded = algorithm.with_random_state(
+                        task_seed(base_seed, graph_name, algorithm.name, repetition)
                     )
+                new_results = evaluate_graph(
+                    graph_results.csr, seeded, self.cache, **options
                 )
-
-            df_results = pd.DataFrame(
-                all_results,
-                columns=[
-                    "graph_name",
-                    "alg_name",
-                    "time",
-                    "number_of_colors",
-                    "coloring",
-                ],
-            )
-
-            min_number_of_colors = df_results["number_of_colors"].min()
-            best_coloring = df_results[
-                df_results["number_of_colors"] == min_number_of_colors
-            ]["coloring"].iloc[0]
-
-            average_time = df_results["time"].mean()
-            time_str = time_ns_to_human_readable(int(average_time))
+                self.store.append(graph_name, algorithm.name, repetition, new_results)
+                summary.add(new_results, repetition)
+            self.store_repeated_results(graph_name, algorithm.name, summary)
+
+    def run_algorithms(self, algorithms: list[ColoringAlgorithm], repeat: int):
+        """Runs every algorithm repeat times on every loaded graph, on a pool
+        of processes when settings.jobs > 1.
+        """
+        jobs = getattr(self.settings, "jobs", 1)
+        if jobs > 1:
+            self.run_algorithms_in_parallel(algorithms, repeat, jobs)
+        else:
+            for algorithm in algorithms:
+                self.run_algorith_on_loaded_graphs(algorithm, repeat=repeat)
+
+    def run_algorithms_in_parallel(
+        self, algorithms: list[ColoringAlgorithm], repeat: int, jobs: int
+    ):
+        """Spreads all (graph, algorithm, repetition) runs over a pool of
+        processes. Every run gets its own seed derived from settings.seed,
+        results are stored the same way as by the serial runner.
+        """
+        graphs = {
+            graph_name: graph_results.csr
+            for graph_name, graph_results in self.loaded_graphs.items()
+        }
+        collected: dict[tuple[str, str], RepeatedRunsSummary] = {
+            (graph_name, algorithm.name): RepeatedRunsSummary()
+            for graph_name in graphs
+            for algorithm in algorithms
+        }
+        total = len(collected) * repeat
+        print(f"\n  Running {total} tasks on {jobs} processes")
+
+        finished = 0
+        for graph_name, alg_name, repetition, results in run_repeats_in_parallel(
+            graphs,
+            algorithms,
+            repeat,
+            jobs,
+            getattr(self.settings, "seed", None),
+            self.cache,
+            self.evaluate_options(),
+        ):
+            collected[(graph_name, alg_name)].add(results, repetition)
+            self.store.append(graph_name, alg_name, repetition, results)
+            finished += 1
+            print(f"  Finished {finished}/{total} tasks", end="\r")
+        print()
+
+        for (graph_name, alg_name), summary in collected.items():
+            self.store_repeated_results(graph_name, alg_name, summary)
+
+    def store_repeated_results(
+        self,
+        graph_name: str,
+        alg_name: str,
+        summary: RepeatedRunsSummary,
+    ):
+        """Keeps the summary of repeated runs, which are already in the
+        result store.
+        """
+        if not summary.runs:
             print(
-                f"  Finished running {algorithm.name} on graph: {graph_name} in average of {time_str}"
+                f"  All {summary.exceeded} runs of {alg_name} on graph: "
+                f"{graph_name} exceeded their budget and were stopped\n"
             )
-            print(f"  Best coloring had {min_number_of_colors} colors\n")
-
-            # Ddrop the coloring column
-            df_results = df_results.drop(columns=["coloring"])
-
-            graph_results.results.update(
-                {
-                    alg_name: {
-                        "last_result": new_results,
-                        "average_time": average_time,
-                        "min_number_of_colors": min_number_of_colors,
-                        "best_coloring": best_coloring,
-                        "df_results": df_results,
-                    }
+            return
+        min_number_of_colors = summary.min_number_of_colors
+        average_time = summary.average_time
+        time_str = time_ns_to_human_readable(int(average_time))
+        print(
+            f"  Finished running {alg_name} on graph: {graph_name} in average of {time_str}"
+        )
+        if summary.runs > 1:
+            print(f"  Times of runs: {timing_to_human_readable(summary.timing)}")
+        if summary.exceeded:
+            print(f"  {summary.exceeded} runs exceeded their budget and were stopped")
+        if summary.max_peak_memory is not None:
+            memory_str = bytes_to_human_readable(summary.max_peak_memory)
+            print(f"  Largest peak of allocated memory was {memory_str}")
+        print(f"  Best coloring had {min_number_of_colors} colors\n")
+
+        self.loaded_graphs[graph_name].results.update(
+            {
+                alg_name: {
+                    "last_result": summary.last_result,
+                    "average_time": average_time,
+                    "timing": summary.timing,
+                    "min_number_of_colors": min_number_of_colors,
+                    "best_coloring": summary.best_coloring,
+                    "max_peak_memory": summary.max_peak_memory,
                 }
-            )
-
-    def export_results_to_csv(self):
-        list_graphs = []
-        # df graphs (graph_name, num_of_vertices, num_of_edges, big_detla)
-        for graph_name, graph_results in self.loaded_graphs.items():
-            assert (
-                "ConnectedSequential" in self.loaded_graphs[graph_name].results
-            ), "No CS results"
-            assert (
-                "BrooksAlgorithm" in self.loaded_graphs[graph_name].results
-            ), "No Brooks results"
-
-            graph = graph_results.graph
-            num_of_vertices = graph.number_of_nodes()
-            num_of_edges = graph.number_of_edges()
-            big_delta = delta(graph)
-            list_graphs.append(
-                (graph_name, num_of_vertices, num_of_edges, big_delta)
-            )
-
-        df_graphs = pd.DataFrame(
-            list_graphs,
-            columns=["graph_name", "num_of_vertices", "num_of_edges", "big_delta"],
+            }
         )
-        df_graphs.to_csv("graphs.csv", index=False)
 
-        all_df_results = [
-            graph_result.results[alg_name]["df_results"]
-            for graph_result in self.loaded_graphs.values()
-            for alg_name in ["ConnectedSequential", "BrooksAlgorithm"]
-        ]
-        df_results = pd.concat(all_df_results)
-        df_results.to_csv("results.csv", index=False)
+    def export_results_to_csv(self):
+        assert self.store.number_of_runs(), "No repeated runs results to export"
+        write_chunks(self.store.graphs_chunks(), Path("graphs.csv"), GRAPH_COLUMNS)
+        write_chunks(self.store.runs_chunks(), Path("results.csv"), RUN_COLUMNS)
 
     def run(self):
-        print("Here is what you can do: ")
-        print("1. Visualize one of the loaded graphs or their calculated colorings")
-        print("2. Run CS algorithm on loaded graphs (once)")
-        print("3. Run Brooks algorithm on loaded graphs (once)")
-        print("4. Run both algorithms on loaded graphs (n times) and compare results ")
-        print("5. Load new graphs")
-        print("6. Export findings to csv")
-        print("7. Exit program")
-        choice = take_user_input("What do you want to do? >>> ", list(range(1, 8)))
-        if choice == 1:
-            self.visualize_selected_graph()
-            self.run()
-        elif choice == 2:
-            self.run_algorith_on_loaded_graphs(ConnectedSequential(random_state=42))
-            self.run()
-        elif choice == 3:
-            self.run_algorith_on_loaded_graphs(BrooksAlgorithm(random_state=42))
-            self.run()
-        elif choice == 4:
-            n = take_user_input(
-                "How many times do you want to run the algorithms? >>> ",
-                [],
-                any_int=True,
-            )
-            self.run_algorith_on_loaded_graphs(ConnectedSequential(), repeat=n)
-            self.run_algorith_on_loaded_graphs(BrooksAlgorithm(), repeat=n)
-            # TODO: Add comparison
-            self.run()
-        elif choice == 5:
-            input_path = input("Enter path to the folder with new graphs >>> ")
-            self.load_graphs(new_graphs_path=Path(input_path).expanduser())
-            self.run()
-        elif choice == 6:
-            assert self.loaded_graphs, "No graphs loaded"
-            print("Exporting findings to csv...")
-            self.export_results_to_csv()
-            print("Exported findings to csv completed successfully\n\n")
-
-            self.run()
-        elif choice == 7:
-            print("Exiting program...")
-            exit(0)
+        backend = getattr(self.settings, "backend", "auto")
+        while True:
+            print("Here is what you can do: ")
+            print("1. Visualize one of the loaded graphs or their calculated colorings")
+            print("2. Run CS algorithm on loaded graphs (once)")
+            print("3. Run Brooks algorithm on loaded graphs (once)")
+            print("4. Run linear-time Brooks algorithm on loaded graphs (once)")
+            print("5. Run both algorithms on loaded graphs (n times) and compare results ")
+            print("6. Load new graphs")
+            print("7. Export findings to csv")
+            print("8. Exit program")
+            choice = take_user_input("What do you want to do? >>> ", list(range(1, 9)))
+            if choice == 1:
+                self.visualize_selected_graph()
+            elif choice == 2:
+                self.run_algorith_on_loaded_graphs(
+                    ConnectedSequential(random_state=42, backend=backend)
+                )
+            elif choice == 3:
+                self.run_algorith_on_loaded_graphs(
+                    BrooksAlgorithm(random_state=42, backend=backend)
+                )
+            elif choice == 4:
+                self.run_algorith_on_loaded_graphs(
+                    LinearBrooksAlgorithm(random_state=42, backend=backend)
+                )
+            elif choice == 5:
+                n = take_user_input(
+                    "How many times do you want to run the algorithms? >>> ",
+                    [],
+                    any_int=True,
+                )
+                self.run_algorithms(
+                    [
+                        ConnectedSequential(backend=backend),
+                        BrooksAlgorithm(backend=backend),
+                    ],
+                    n,
+                )
+                # TODO: Add comparison
+            elif choice == 6:
+                input_path = input("Enter path to the folder with new graphs >>> ")
+                self.load_graphs(new_graphs_path=Path(input_path).expanduser())
+            elif choice == 7:
+                assert self.loaded_graphs, "No graphs loaded"
+                print("Exporting findings to csv...")
+                self.export_results_to_csv()
+                print("Exported findings to csv completed successfully\n\n")
+            elif choice == 8:
+                print("Exiting program...")
+                return
 
 
 def take_user_input(message: str, possilities: list[int], any_int=False) -> int:
@@ -293,6 +481,8 @@ def take_user_input(message: str, possilities: list[int], any_int=False) -> int:
 
 USAGE = """
 brocs <input>
+brocs convert <input> [--output OUTPUT]
+brocs bench <input> [--algorithms cs,brooks] [--repeat N] [--jobs K] [--out OUT]
 """
 
 EPILOG = """
@@ -305,30 +495,293 @@ After running the program with provided input you will be presented with a menu
 """
 
 
-def main():
+def convert(argv: list[str]) -> int:
     parser = argparse.ArgumentParser(
-        description="Brocs",
-        usage=USAGE,
-        epilog=EPILOG,
+        prog="brocs convert",
+        description="Convert dense .npy adjacency matrices to the compact "
+        "brocs .npz graph format",
+    )
+    parser.add_argument(
+        "input",
+        help="Path to a .npy file or a directory with .npy files",
+    )
+    parser.add_argument(
+        "--output",
+        help="Directory for the converted files, defaults to the input "
+        "directory name with a _csr suffix, next to it",
     )
+    args = parser.parse_args(argv)
+    source = Path(args.input).expanduser()
+    if not source.exists():
+        print(f"Path {source} does not exist. Exiting...")
+        return 1
+
+    directory = (source.parent if source.is_file() else source).resolve()
+    default_output = directory.with_name(f"{directory.name}_csr")
+    output = Path(args.output).expanduser() if args.output else default_output
+    converted = convert_directory(source, output)
+    print(f"Converted {converted} graphs to {output}")
+    return 0
+
+
+ALGORITHMS: dict[str, type[ColoringAlgorithm]] = {
+    "cs": ConnectedSequential,
+    "brooks": LinearBrooksAlgorithm,
+    "brooks-reference": BrooksAlgorithm,
+}
+
+RESULT_FORMATS = (".csv", ".parquet")
+
+# exit codes of the batch commands
+EXIT_OK = 0
+EXIT_NO_GRAPHS = 1
+EXIT_BAD_ARGUMENTS = 2
+EXIT_INVALID_COLORING = 3
+
+
+def add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    """Arguments shared by the interactive program and batch commands."""
     parser.add_argument(
         "input",
-        help="Path to a input file with graph matrix or a directory with input files",
+        help="Path to a input file with graph matrix (.npy, .npz), DIMACS graph "
+        "(.col) or edge list (.edges, .edgelist), or a directory with input files",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Memory map .npy files and read them straight into a compact "
+        "sparse form, without holding the dense matrix in memory",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of workers loading graph files and running repeated "
+        "colorings in parallel",
+    )
+    parser.add_argument(
+        "--pool",
+        choices=list(POOLS),
+        default="thread",
+        help="Kind of the worker pool used with --jobs",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Base seed of repeated runs, every run derives its own seed from it",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory of a persistent cache of seeded runs, reused when "
+        "the same graphs are colored again",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_BYTES // 1024**2,
+        help="Size limit of the result cache in MiB, least recently used "
+        "results are removed first",
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        help="SQLite file repeated runs are appended to while they progress, "
+        "kept after the program ends. A temporary file by default",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="auto",
+        help="Backend of the coloring kernels, auto uses numba when it is "
+        "installed. Colorings do not depend on it",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="Record the time of every phase of the algorithms and counters "
+        "of their operations, stored with every run",
+    )
+    parser.add_argument(
+        "--track-memory",
+        action="store_true",
+        help="Measure the peak memory allocated by every run and the size of "
+        "its graph, stored with every run. Tracing allocations slows the "
+        "algorithms down, so times of such runs are higher",
+    )
+    parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="Time every run over several samples of calls, after a warm-up. "
+        "The time of a run is the median of its samples",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=TimingSettings().warmup,
+        help="Untimed calls before the samples of a run, with --timing",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=TimingSettings().samples,
+        help="Number of timed samples of a run, with --timing",
+    )
+    parser.add_argument(
+        "--min-sample-time",
+        type=float,
+        default=TimingSettings().min_sample_time / 1e6,
+        help="Milliseconds a sample lasts at least, calls of fast runs are "
+        "repeated within a sample until it does, with --timing",
+    )
+    parser.add_argument(
+        "--keep-gc",
+        action="store_true",
+        help="Keep the garbage collector on while runs are timed, with --timing",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=None,
+        help="Seconds a single run may take, slower runs are stopped and "
+        "recorded as over their budget",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        default=None,
+        help="MiB the memory of the process may grow by during a single run, "
+        "runs using more are stopped and recorded as over their budget",
     )
     parser.add_argument(
         "--debug",
         action="store_true",
         help="Print debug messages",
     )
-    args = parser.parse_args()
+
+
+def setup_program(args: argparse.Namespace) -> Program:
     args.input = Path(args.input).expanduser()
 
     if args.debug:
         logging.basicConfig(level=logging.DEBUG)
 
-    program = Program(args)  # type: ignore
-    program.load_graphs()
-    program.run()
+    cache = None
+    if args.cache_dir is not None:
+        args.cache_dir = Path(args.cache_dir).expanduser()
+        cache = ResultCache(args.cache_dir, args.cache_size * 1024**2)
+
+    store = ResultStore(Path(args.store).expanduser() if args.store else None)
+    return Program(args, cache=cache, store=store)  # type: ignore
+
+
+def bench(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="brocs bench",
+        description="Run coloring algorithms on graphs without the interactive "
+        "menu and export the results of every run",
+    )
+    add_run_arguments(parser)
+    parser.add_argument(
+        "--algorithms",
+        default="cs,brooks",
+        help=f"Comma separated algorithms to run, from: {', '.join(ALGORITHMS)}",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Number of runs of every algorithm on every graph",
+    )
+    parser.add_argument(
+        "--out",
+        default="results.csv",
+        help="Output file, .csv or .parquet (needs pyarrow). Every row is one "
+        "run, joined with the size and maximal degree of its graph",
+    )
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.algorithms.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ALGORITHMS]
+    if unknown or not names:
+        print(
+            f"Unknown algorithms: {', '.join(unknown)}. "
+            f"Choose from: {', '.join(ALGORITHMS)}"
+        )
+        return EXIT_BAD_ARGUMENTS
+    if args.repeat < 1:
+        print("--repeat has to be a positive number")
+        return EXIT_BAD_ARGUMENTS
+    if args.samples < 1 or args.warmup < 0:
+        print("--samples has to be a positive number, --warmup not negative")
+        return EXIT_BAD_ARGUMENTS
+
+    out = Path(args.out).expanduser()
+    if out.suffix not in RESULT_FORMATS:
+        print(
+            f"Unsupported output format {out.suffix!r}, "
+            f"use one of: {', '.join(RESULT_FORMATS)}"
+        )
+        return EXIT_BAD_ARGUMENTS
+    if out.suffix == ".parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Writing .parquet files needs pyarrow, install it or use .csv")
+            return EXIT_BAD_ARGUMENTS
+
+    if not Path(args.input).expanduser().exists():
+        print(f"Path {args.input} does not exist. Exiting...")
+        return EXIT_NO_GRAPHS
+    program = setup_program(args)
+    with program.store as store:
+        program.load_graphs()
+        if not program.loaded_graphs:
+            print(f"No graphs loaded from {args.input}. Exiting...")
+            return EXIT_NO_GRAPHS
+
+        algorithms = [ALGORITHMS[name](backend=args.backend) for name in names]
+        program.run_algorithms(algorithms, args.repeat)
+
+        written = write_chunks(
+            store.runs_chunks(with_graphs=True),
+            out,
+            RUN_COLUMNS + GRAPH_COLUMNS[1:],
+        )
+        print(f"Exported {written} runs to {out}")
+
+        invalid = store.invalid_runs()
+        exceeded = store.exceeded_runs()
+    for graph_name, alg_name, budget in exceeded:
+        print(f"{alg_name} exceeded its {budget} budget on graph {graph_name}")
+    for graph_name, alg_name in invalid:
+        print(f"{alg_name} returned an invalid coloring of graph {graph_name}")
+    return EXIT_INVALID_COLORING if invalid else EXIT_OK
+
+
+COMMANDS = {
+    "convert": convert,
+    "bench": bench,
+}
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(
+        description="Brocs",
+        usage=USAGE,
+        epilog=EPILOG,
+    )
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    program = setup_program(args)
+    with program.store:
+        program.load_graphs()
+        program.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,155 @@
+import os
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def bytes_to_human_readable(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024**2:
+        return f"{size / 1024:.1f} KiB"
+    elif size < 1024**3:
+        return f"{size / 1024**2:.1f} MiB"
+    else:
+        return f"{size / 1024**3:.2f} GiB"
+
+
+def peak_rss() -> int:
+    """High-water mark of the resident memory of this process, in bytes.
+    Returns 0 where it cannot be measured.
+    """
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def current_rss() -> int:
+    """Resident memory of this process now, in bytes. Falls back to the
+    high-water mark where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except OSError:
+        return peak_rss()
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def _reset_rss_high_water() -> bool:
+    """Lowers the high-water mark of the resident memory to the current
+    value. Works on Linux only, returns whether it was reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _rss_high_water() -> int:
+    """High-water mark of the resident memory since the last reset."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return peak_rss()
+
+
+@dataclass(slots=True)
+class MemoryUsage:
+    """Memory used inside a ``track_peak_memory`` block, in bytes.
+
+    Attributes:
+        peak_traced: Peak of the allocations over the start of the block.
+        peak_rss: Peak of the resident memory over the start of the block.
+    """
+
+    peak_traced: int = 0
+    peak_rss: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"peak allocated {bytes_to_human_readable(self.peak_traced)}, "
+            f"peak RSS growth {bytes_to_human_readable(self.peak_rss)}"
+        )
+
+
+# Trackers open in any thread. tracemalloc and the kernel keep a single
+# peak for the process, reset by every tracker opened, so the peaks are
+# folded into the open trackers before every reset and when any of them is
+# closed.
+_lock = threading.Lock()
+_open_trackers: list["_Tracker"] = []
+_started_tracing = False
+_resets_rss_high_water: Optional[bool] = None
+
+
+@dataclass(slots=True, eq=False)
+class _Tracker:
+    baseline: int
+    peak: int
+    rss_baseline: int
+    rss_peak: int
+
+
+def _fold_peak() -> None:
+    _, peak = tracemalloc.get_traced_memory()
+    rss = _rss_high_water() if _resets_rss_high_water else current_rss()
+    for tracker in _open_trackers:
+        tracker.peak = max(tracker.peak, peak)
+        tracker.rss_peak = max(tracker.rss_peak, rss)
+
+
+@contextmanager
+def track_peak_memory() -> Iterator[MemoryUsage]:
+    """Measures the peak memory allocated inside the ``with`` block.
+
+    Uses tracemalloc, which also sees NumPy buffers. Memory mapped file
+    pages are not allocations, they only show up in the resident memory.
+    Its peak is read from the high-water mark of the kernel, reset when
+    the block starts. Where it cannot be reset (outside Linux), only the
+    resident memory at the ends of the block is seen.
+    Allocations of other threads running meanwhile are counted too.
+    Trackers may be nested and used from several threads. tracemalloc is
+    started by the first open tracker and stopped after the last one,
+    unless it was tracing before.
+    """
+    global _started_tracing, _resets_rss_high_water
+    usage = MemoryUsage()
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _fold_peak()
+        tracemalloc.reset_peak()
+        _resets_rss_high_water = _reset_rss_high_water()
+        baseline, _ = tracemalloc.get_traced_memory()
+        rss = current_rss()
+        tracker = _Tracker(baseline, baseline, rss, rss)
+        _open_trackers.append(tracker)
+    try:
+        yield usage
+    finally:
+        with _lock:
+            _fold_peak()
+            _open_trackers.remove(tracker)
+            if not _open_trackers and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+        usage.peak_traced = tracker.peak - tracker.baseline
+        usage.peak_rss = max(tracker.rss_peak - tracker.rss_baseline, 0)
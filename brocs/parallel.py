@@ -0,0 +1,125 @@
+import logging
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+import numpy as np
+
+from brocs.algorithms.base import ColoringAlgorithm
+from brocs.csr import GraphLike
+from brocs.evaluation import EvaluationResults, evaluate_graph, uses_cache
+
+if TYPE_CHECKING:
+    from brocs.cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# graphs shipped to every worker process once, instead of with every task
+_worker_graphs: dict[str, GraphLike] = {}
+
+
+def task_seed(base_seed: int, graph_name: str, alg_name: str, repetition: int) -> int:
+    """Seed of a single (graph, algorithm, repetition) run.
+
+    Depends only on its arguments, so a sweep gives the same colorings
+    whichever worker runs a task and in whatever order tasks finish.
+    """
+    sequence = np.random.SeedSequence(
+        [
+            base_seed,
+            zlib.crc32(graph_name.encode()),
+            zlib.crc32(alg_name.encode()),
+            repetition,
+        ]
+    )
+    return int(sequence.generate_state(1)[0])
+
+
+def _init_worker(graphs: dict[str, GraphLike]) -> None:
+    global _worker_graphs
+    _worker_graphs = graphs
+
+
+def _run_task(
+    graph_name: str,
+    algorithm: ColoringAlgorithm,
+    repetition: int,
+    evaluate_options: dict[str, Any],
+) -> tuple[str, str, int, EvaluationResults]:
+    results = evaluate_graph(
+        _worker_graphs[graph_name], algorithm, **evaluate_options
+    )
+    # the parent process already holds the graph, do not send it back
+    results.graph = None
+    return graph_name, algorithm.name, repetition, results
+
+
+def run_repeats_in_parallel(
+    graphs: dict[str, GraphLike],
+    algorithms: list[ColoringAlgorithm],
+    repeat: int,
+    jobs: int,
+    base_seed: Optional[int] = None,
+    cache: Optional["ResultCache"] = None,
+    evaluate_options: Optional[dict[str, Any]] = None,
+) -> Iterator[tuple[str, str, int, EvaluationResults]]:
+    """Runs every (graph, algorithm, repetition) task on a pool of processes.
+
+    Args:
+        graphs: Graphs to color, by name.
+        algorithms: Algorithms to run on every graph.
+        repeat: Number of runs of every algorithm on every graph.
+        jobs: Number of worker processes.
+        base_seed: Seed every task seed is derived from, fresh when None.
+        cache: Result cache checked before a task is submitted and filled
+            with the results of finished tasks. Only used with a base_seed,
+            fresh seeds would never be looked up again, and with evaluate
+            options allowed by ``uses_cache``.
+        evaluate_options: Keyword arguments of every ``evaluate_graph``
+            call, like instrument or track_memory.
+
+    Yields:
+        Graph name, algorithm name, repetition and results of every task,
+        in the order the tasks finish.
+    """
+    if evaluate_options is None:
+        evaluate_options = {}
+    if base_seed is None:
+        base_seed = int(np.random.SeedSequence().generate_state(1)[0])
+        cache = None
+    if not uses_cache(**evaluate_options):
+        cache = None
+    logger.info(f"Parallel run with base seed {base_seed}")
+
+    tasks = []
+    for graph_name, graph in graphs.items():
+        for algorithm in algorithms:
+            for repetition in range(repeat):
+                seeded = algorithm.with_random_state(
+                    task_seed(base_seed, graph_name, algorithm.name, repetition)
+                )
+                key = cache.key(graph, seeded) if cache is not None else None
+                results = cache.get(key, graph) if key is not None else None
+                if results is not None:
+                    yield graph_name, algorithm.name, repetition, results
+                else:
+                    tasks.append((graph_name, seeded, repetition, key))
+    if not tasks:
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(graphs,)
+    ) as executor:
+        futures = {
+            executor.submit(
+                _run_task, graph_name, algorithm, repetition, evaluate_options
+            ): key
+            for graph_name, algorithm, repetition, key in tasks
+        }
+        for future in as_completed(futures):
+            graph_name, alg_name, repetition, results = future.result()
+            results.graph = graphs[graph_name]
+            # runs over their budget are left uncolored, never cached
+            if futures[future] is not None and results.budget_exceeded is None:
+                cache.put(futures[future], results)
+            yield graph_name, alg_name, repetition, results
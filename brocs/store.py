@@ -0,0 +1,388 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import weakref
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from brocs.evaluation import EvaluationResults
+from brocs.helpers import compact_coloring
+from brocs.invariants import GraphInvariants
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 256
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS graphs (
+    graph_name TEXT PRIMARY KEY,
+    num_of_vertices INTEGER NOT NULL,
+    num_of_edges INTEGER NOT NULL,
+    big_delta INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    graph_name TEXT NOT NULL,
+    alg_name TEXT NOT NULL,
+    repetition INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    number_of_colors INTEGER,
+    is_coloring_correct INTEGER NOT NULL,
+    coloring_dtype TEXT NOT NULL,
+    coloring BLOB NOT NULL,
+    instrumentation TEXT,
+    peak_memory INTEGER,
+    peak_rss INTEGER,
+    graph_memory INTEGER,
+    time_min INTEGER,
+    time_p95 INTEGER,
+    time_stdev INTEGER,
+    time_ci_low INTEGER,
+    time_ci_high INTEGER,
+    timing_loops INTEGER,
+    timing_samples INTEGER,
+    budget_exceeded TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_graph ON runs (graph_name, alg_name);
+"""
+
+# columns added to the runs table after its first version, with their
+# types, added to older stores when they are opened
+_ADDED_RUN_COLUMNS = {
+    "instrumentation": "TEXT",
+    "peak_memory": "INTEGER",
+    "peak_rss": "INTEGER",
+    "graph_memory": "INTEGER",
+    "time_min": "INTEGER",
+    "time_p95": "INTEGER",
+    "time_stdev": "INTEGER",
+    "time_ci_low": "INTEGER",
+    "time_ci_high": "INTEGER",
+    "timing_loops": "INTEGER",
+    "timing_samples": "INTEGER",
+    "budget_exceeded": "TEXT",
+}
+
+GRAPH_COLUMNS = ("graph_name", "num_of_vertices", "num_of_edges", "big_delta")
+
+# measured only in runs with memory tracking, NULL in other runs
+MEMORY_COLUMNS = ("peak_memory", "peak_rss", "graph_memory")
+
+# statistics of runs timed by the timing harness, time is their median
+TIMING_COLUMNS = (
+    "time_min",
+    "time_p95",
+    "time_stdev",
+    "time_ci_low",
+    "time_ci_high",
+    "timing_loops",
+    "timing_samples",
+)
+
+RUN_COLUMNS = (
+    "graph_name",
+    "alg_name",
+    "repetition",
+    "time",
+    "number_of_colors",
+    "is_coloring_correct",
+    "instrumentation",
+    *MEMORY_COLUMNS,
+    *TIMING_COLUMNS,
+    "budget_exceeded",
+)
+
+# columns of a stored run, in the order of the rows buffered by append
+_STORED_RUN_COLUMNS = RUN_COLUMNS[:6] + ("coloring_dtype", "coloring") + RUN_COLUMNS[6:]
+
+
+def encode_coloring(coloring: Sequence[int]) -> tuple[bytes, str]:
+    """Packs a coloring into the smallest integer dtype holding it.
+
+    Returns:
+        Raw array bytes and the name of their dtype.
+    """
+    colors = compact_coloring(coloring)
+    return colors.tobytes(), colors.dtype.str
+
+
+def decode_coloring(blob: bytes, dtype: str) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.dtype(dtype))
+
+
+def encode_timing(results: EvaluationResults) -> tuple[Optional[int], ...]:
+    """Values of ``TIMING_COLUMNS`` of a run, all None without timing."""
+    timing = results.timing
+    if timing is None:
+        return (None,) * len(TIMING_COLUMNS)
+    low, high = timing.confidence_interval()
+    times = (timing.min, timing.p95, timing.stdev, low, high)
+    return (*(round(t) for t in times), timing.loops, len(timing.times))
+
+
+def encode_instrumentation(results: EvaluationResults) -> Optional[str]:
+    """Spans and counters of an instrumented run as JSON, None otherwise."""
+    if not results.spans and not results.counters:
+        return None
+    return json.dumps({"spans": results.spans, "counters": results.counters})
+
+
+class ResultStore:
+    """SQLite store of repeated runs, written while the runs progress.
+
+    Runs are buffered and appended in batches of ``batch_size`` rows, every
+    batch in a single transaction, so a crash loses at most one batch and
+    memory does not grow with the number of runs. Colorings are kept as
+    binary blobs of their array bytes.
+
+    Args:
+        path: SQLite database file, runs already stored there are kept.
+            A temporary file, removed on close, when None.
+        batch_size: Number of runs buffered before they are written.
+    """
+
+    def __init__(
+        self, path: Optional[Path] = None, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        if path is None:
+            descriptor, temporary = tempfile.mkstemp(
+                prefix="brocs-results-", suffix=".sqlite"
+            )
+            os.close(descriptor)
+            path = Path(temporary)
+            self._finalizer = weakref.finalize(self, _remove, path)
+        else:
+            self._finalizer = None
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._buffer: list[tuple] = []
+        self._connection = sqlite3.connect(self.path)
+        self._connection.executescript(_SCHEMA)
+        self._add_missing_columns()
+        self._allow_missing_number_of_colors()
+
+    def _add_missing_columns(self) -> None:
+        columns = {
+            row[1] for row in self._connection.execute("PRAGMA table_info(runs)")
+        }
+        with self._connection:
+            for column, kind in _ADDED_RUN_COLUMNS.items():
+                if column not in columns:
+                    self._connection.execute(
+                        f"ALTER TABLE runs ADD COLUMN {column} {kind}"
+                    )
+
+    def _allow_missing_number_of_colors(self) -> None:
+        """Older stores have number_of_colors NOT NULL. SQLite cannot drop
+        the constraint, so their runs are copied to a table of the current
+        schema in one transaction, runs over their budget losing their
+        number of colors.
+        """
+        not_null = {
+            row[1]: row[3]
+            for row in self._connection.execute("PRAGMA table_info(runs)")
+        }
+        if not not_null["number_of_colors"]:
+            return
+        columns = ", ".join(("id",) + _STORED_RUN_COLUMNS)
+        self._connection.executescript(
+            "BEGIN;"
+            "DROP INDEX IF EXISTS runs_by_graph;"
+            "ALTER TABLE runs RENAME TO runs_old;"
+            f"{_SCHEMA}"
+            f"INSERT INTO runs ({columns}) SELECT {columns} FROM runs_old;"
+            "UPDATE runs SET number_of_colors = NULL "
+            "WHERE budget_exceeded IS NOT NULL;"
+            "DROP TABLE runs_old;"
+            "COMMIT;"
+        )
+        logger.info(f"Allowed missing numbers of colors in {self.path}")
+
+    def add_graph(self, graph_name: str, invariants: GraphInvariants) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO graphs VALUES (?, ?, ?, ?)",
+                (
+                    graph_name,
+                    invariants.number_of_nodes,
+                    invariants.number_of_edges,
+                    invariants.delta,
+                ),
+            )
+
+    def append(
+        self,
+        graph_name: str,
+        alg_name: str,
+        repetition: int,
+        results: EvaluationResults,
+    ) -> None:
+        blob, dtype = encode_coloring(results.coloring)
+        self._buffer.append(
+            (
+                graph_name,
+                alg_name,
+                repetition,
+                int(results.time_elapsed),
+                # runs over their budget colored nothing
+                None
+                if results.budget_exceeded is not None
+                else int(results.unique_colors),
+                bool(results.is_coloring_correct),
+                dtype,
+                blob,
+                encode_instrumentation(results),
+                results.peak_memory,
+                results.peak_rss,
+                results.graph_memory,
+                *encode_timing(results),
+                results.budget_exceeded,
+            )
+        )
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes buffered runs in a single transaction."""
+        if not self._buffer:
+            return
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT INTO runs ({', '.join(_STORED_RUN_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_STORED_RUN_COLUMNS))})",
+                self._buffer,
+            )
+        logger.debug(f"Stored {len(self._buffer)} runs in {self.path}")
+        self._buffer.clear()
+
+    def number_of_runs(self) -> int:
+        self.flush()
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM runs").fetchone()
+        return count
+
+    def invalid_runs(self) -> list[tuple[str, str]]:
+        """(graph name, algorithm name) of runs with an invalid coloring,
+        runs over their budget left the graph uncolored and are not listed.
+        """
+        self.flush()
+        return self._connection.execute(
+            "SELECT DISTINCT graph_name, alg_name FROM runs "
+            "WHERE NOT is_coloring_correct AND budget_exceeded IS NULL "
+            "ORDER BY graph_name, alg_name"
+        ).fetchall()
+
+    def exceeded_runs(self) -> list[tuple[str, str, str]]:
+        """(graph name, algorithm name, budget) of runs over their budget."""
+        self.flush()
+        return self._connection.execute(
+            "SELECT DISTINCT graph_name, alg_name, budget_exceeded FROM runs "
+            "WHERE budget_exceeded IS NOT NULL ORDER BY graph_name, alg_name"
+        ).fetchall()
+
+    def colorings(self, graph_name: str, alg_name: str) -> Iterator[np.ndarray]:
+        """Colorings of all stored runs of the algorithm on the graph."""
+        self.flush()
+        rows = self._connection.execute(
+            "SELECT coloring, coloring_dtype FROM runs "
+            "WHERE graph_name = ? AND alg_name = ? ORDER BY id",
+            (graph_name, alg_name),
+        )
+        for blob, dtype in rows:
+            yield decode_coloring(blob, dtype)
+
+    def graphs_chunks(
+        self, chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        self.flush()
+        yield from pd.read_sql_query(
+            f"SELECT {', '.join(GRAPH_COLUMNS)} FROM graphs ORDER BY rowid",
+            self._connection,
+            chunksize=chunk_rows,
+        )
+
+    def runs_chunks(
+        self, with_graphs: bool = False, chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        """Stored runs, without colorings, in chunks of ``chunk_rows`` rows.
+        Spans and counters of instrumented runs are a JSON column.
+
+        Args:
+            with_graphs: Join every run with the size and maximal degree of
+                its graph.
+        """
+        self.flush()
+        columns = [f"runs.{column}" for column in RUN_COLUMNS]
+        join = ""
+        if with_graphs:
+            columns += [f"graphs.{column}" for column in GRAPH_COLUMNS[1:]]
+            join = "LEFT JOIN graphs ON graphs.graph_name = runs.graph_name"
+        query = f"SELECT {', '.join(columns)} FROM runs {join} ORDER BY runs.id"
+        for chunk in pd.read_sql_query(query, self._connection, chunksize=chunk_rows):
+            chunk["is_coloring_correct"] = chunk["is_coloring_correct"].astype(bool)
+            # integers even with missing values, which would make them floats
+            for column in ("number_of_colors",) + MEMORY_COLUMNS + TIMING_COLUMNS:
+                chunk[column] = chunk[column].astype("Int64")
+            yield chunk
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _remove(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+def write_chunks(
+    chunks: Iterator[pd.DataFrame], file: Path, columns: Sequence[str]
+) -> int:
+    """Writes DataFrame chunks to a .csv or .parquet file one at a time,
+    every chunk of a .parquet file is a separate row group.
+
+    Returns:
+        Number of written rows.
+    """
+    file = Path(file)
+    written = 0
+    if file.suffix == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(file, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pd.DataFrame(columns=list(columns)).to_parquet(file, index=False)
+        return written
+
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(file, mode="w" if header else "a", header=header, index=False)
+        header = False
+        written += len(chunk)
+    if header:
+        pd.DataFrame(columns=list(columns)).to_csv(file, index=False)
+    return written
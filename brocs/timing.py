@@ -0,0 +1,146 @@
+"""
+Timing harness of evaluated runs.
+
+A single call of a sub-millisecond coloring is mostly timer resolution and
+noise, so ``time_calls`` times a function like ``timeit``: after the
+warm-up, the number of calls per sample is doubled until a sample lasts
+``min_sample_time`` nanoseconds, then every sample gives the time of one
+call. The garbage collector may be turned off while calls are timed.
+A setup function gives every call a fresh argument, made before the sample
+outside of the timed code, for calls that must not reuse what an earlier
+call cached.
+"""
+
+import gc
+import math
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+from scipy import stats
+
+T = TypeVar("T")
+
+# calls per sample are not doubled further, whatever their time
+MAX_LOOPS = 1 << 16
+
+
+@dataclass(slots=True, frozen=True)
+class TimingSettings:
+    """How ``time_calls`` times a function.
+
+    Attributes:
+        warmup: Untimed calls before the timed ones.
+        samples: Number of timed samples.
+        min_sample_time: Calls per sample are doubled until a sample lasts
+            this many nanoseconds, a sample is one call with 0.
+        disable_gc: Turns the garbage collector off while calls are timed.
+    """
+
+    warmup: int = 1
+    samples: int = 5
+    min_sample_time: int = 1_000_000
+    disable_gc: bool = True
+
+    def __post_init__(self) -> None:
+        if self.samples < 1 or self.warmup < 0:
+            raise ValueError("Timing needs a sample and no negative warm-up")
+
+
+@dataclass(slots=True)
+class TimingStatistics:
+    """Times of a single call, in nanoseconds, over the samples.
+
+    Attributes:
+        times: Time of one call in every sample.
+        loops: Calls per sample.
+    """
+
+    times: Sequence[float]
+    loops: int = 1
+
+    @property
+    def min(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.times)
+
+    @property
+    def p95(self) -> float:
+        if len(self.times) < 2:
+            return self.times[0]
+        return statistics.quantiles(self.times, n=20, method="inclusive")[-1]
+
+    @property
+    def stdev(self) -> float:
+        return statistics.stdev(self.times) if len(self.times) > 1 else 0.0
+
+    def confidence_interval(self, level: float = 0.95) -> tuple[float, float]:
+        """Student's t confidence interval of the mean time, its lower end
+        is at least 0.
+        """
+        n = len(self.times)
+        if n < 2:
+            return self.mean, self.mean
+        half_width = stats.t.ppf((1 + level) / 2, n - 1) * self.stdev / math.sqrt(n)
+        return max(self.mean - half_width, 0.0), self.mean + half_width
+
+
+def time_calls(
+    function: Callable[..., T],
+    settings: TimingSettings,
+    setup: Optional[Callable[[], Any]] = None,
+) -> tuple[T, TimingStatistics]:
+    """Times calls of function with ``time.perf_counter_ns``.
+
+    Args:
+        function: Function timed, called without arguments, or with
+            a result of setup when it is given.
+        settings: Warm-up, samples and the garbage collector.
+        setup: Makes the argument of every call, untimed.
+
+    Returns:
+        Result of the last call and the times of a single call.
+    """
+    result = None
+
+    def arguments(loops: int) -> list[tuple]:
+        if setup is None:
+            return [()] * loops
+        return [(setup(),) for _ in range(loops)]
+
+    def timed(loops: int) -> int:
+        nonlocal result
+        calls = arguments(loops)
+        gc_was_enabled = gc.isenabled()
+        if settings.disable_gc:
+            gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            for argument in calls:
+                result = function(*argument)
+            return time.perf_counter_ns() - start
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    for argument in arguments(settings.warmup):
+        function(*argument)
+
+    loops = 1
+    elapsed = timed(loops)
+    while elapsed < settings.min_sample_time and loops < MAX_LOOPS:
+        loops *= 2
+        elapsed = timed(loops)
+
+    # the calibrating sample is the first one
+    times = [elapsed / loops]
+    times += [timed(loops) / loops for _ in range(settings.samples - 1)]
+    return result, TimingStatistics(times, loops)
@@ -0,0 +1,248 @@
+"""
+Linear time traversals over ``CSRGraph``.
+
+All loops are iterative, so deep graphs (long paths, chains of blocks)
+never hit the recursion limit. Adjacency arrays are read through
+``memoryview`` which yields Python ints without copying the arrays.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from brocs.budget import current_token
+from brocs.csr import CSRGraph
+from brocs.instrumentation import current_recorder
+
+
+@dataclass(slots=True)
+class BlockDecomposition:
+    """Result of a depth first search with low-links.
+
+    Attributes:
+        blocks: Vertex lists of the biconnected components (blocks).
+            An isolated vertex forms a block by itself.
+        is_articulation: Boolean mask of the articulation (cut) vertices.
+        component: Connected component label of every vertex.
+        number_of_components: Number of connected components.
+    """
+
+    blocks: List[List[int]]
+    is_articulation: np.ndarray
+    component: np.ndarray
+    number_of_components: int
+
+    @property
+    def articulation_points(self) -> np.ndarray:
+        return np.flatnonzero(self.is_articulation)
+
+
+def block_decomposition(csr: CSRGraph) -> BlockDecomposition:
+    """Blocks, articulation points and connected components of the graph
+    found in one Hopcroft-Tarjan depth first search, O(n + m).
+    """
+    n = csr.number_of_nodes()
+    indptr = memoryview(csr.indptr)
+    indices = memoryview(csr.indices)
+
+    disc = [-1] * n
+    low = [0] * n
+    is_articulation = np.zeros(n, dtype=bool)
+    component = [0] * n
+    blocks = []
+    time = 0
+    number_of_components = 0
+    token = current_token()
+
+    for root in range(n):
+        if disc[root] != -1:
+            continue
+        disc[root] = low[root] = time
+        time += 1
+        component[root] = number_of_components
+        number_of_components += 1
+
+        if indptr[root] == indptr[root + 1]:
+            blocks.append([root])
+            continue
+
+        vertex_stack = [root]
+        # frames of the simulated recursion: [vertex, parent, next position]
+        frames = [[root, -1, indptr[root]]]
+        root_children = 0
+
+        while frames:
+            frame = frames[-1]
+            v, parent, position = frame
+            if position < indptr[v + 1]:
+                frame[2] = position + 1
+                w = indices[position]
+                if disc[w] == -1:
+                    disc[w] = low[w] = time
+                    time += 1
+                    # the search may take long, the budget is checked
+                    # every 4096 vertices
+                    if not time & 4095:
+                        token.check()
+                    component[w] = component[root]
+                    vertex_stack.append(w)
+                    frames.append([w, v, indptr[w]])
+                    if v == root:
+                        root_children += 1
+                elif w != parent and disc[w] < low[v]:
+                    low[v] = disc[w]
+                continue
+
+            frames.pop()
+            if parent == -1:
+                continue
+            if low[v] < low[parent]:
+                low[parent] = low[v]
+            if low[v] >= disc[parent]:
+                # parent separates the subtree of v from the rest of the graph
+                if parent != root:
+                    is_articulation[parent] = True
+                block = []
+                while True:
+                    w = vertex_stack.pop()
+                    block.append(w)
+                    if w == v:
+                        break
+                block.append(parent)
+                blocks.append(block)
+
+        if root_children >= 2:
+            is_articulation[root] = True
+
+    return BlockDecomposition(
+        blocks=blocks,
+        is_articulation=is_articulation,
+        component=np.array(component, dtype=np.int32),
+        number_of_components=number_of_components,
+    )
+
+
+def block_subgraphs(
+    csr: CSRGraph,
+    decomposition: BlockDecomposition,
+    selected: Optional[Sequence[int]] = None,
+) -> List[Tuple[np.ndarray, CSRGraph]]:
+    """Subgraphs induced by the blocks, all built in one pass.
+
+    Every block gets its own copy of its vertices, so the copies form
+    a disjoint union which ``CSRGraph.split`` cuts into blocks at once.
+
+    Args:
+        csr: Graph of the decomposition.
+        decomposition: Blocks of the graph.
+        selected: Indices of the blocks to build, in increasing order.
+            All blocks when None.
+
+    Returns:
+        Like ``CSRGraph.split``, (vertices, subgraph) of every selected
+        block in the order of ``decomposition.blocks``, vertices in
+        increasing order.
+    """
+    n = csr.number_of_nodes()
+    sizes = np.array([len(block) for block in decomposition.blocks], dtype=np.int64)
+    labels = np.repeat(np.arange(len(sizes)), sizes)
+    vertices = np.fromiter(
+        (v for block in decomposition.blocks for v in sorted(block)),
+        dtype=np.int64,
+        count=int(sizes.sum()),
+    )
+    keys = labels * n + vertices
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    # a vertex other than a cut vertex lies in exactly one block,
+    # which holds all of its edges
+    block_of = np.full(n, -1, dtype=np.int64)
+    inner = ~decomposition.is_articulation[vertices]
+    block_of[vertices[inner]] = labels[inner]
+
+    edges = csr.edges().astype(np.int64)
+    u, v = edges[:, 0], edges[:, 1]
+    edge_block = np.where(block_of[u] >= 0, block_of[u], block_of[v])
+
+    # an edge joining two cut vertices is in the only block holding both,
+    # looked up among the blocks of the end lying in fewer blocks
+    between_cuts = np.flatnonzero(edge_block < 0)
+    if len(between_cuts):
+        cut_vertices = vertices[~inner]
+        by_vertex = np.argsort(cut_vertices, kind="stable")
+        blocks_of_cut = labels[~inner][by_vertex]
+        counts = np.bincount(cut_vertices, minlength=n)
+        starts = np.cumsum(counts) - counts
+
+        ends_u, ends_v = u[between_cuts], v[between_cuts]
+        fewer = counts[ends_u] <= counts[ends_v]
+        ends, others = np.where(fewer, ends_u, ends_v), np.where(fewer, ends_v, ends_u)
+        candidates = counts[ends]
+        owner = np.repeat(np.arange(len(between_cuts)), candidates)
+        offsets = np.arange(len(owner)) - np.repeat(
+            np.cumsum(candidates) - candidates, candidates
+        )
+        blocks = blocks_of_cut[starts[ends][owner] + offsets]
+        wanted = blocks * n + others[owner]
+        found = sorted_keys[
+            np.minimum(np.searchsorted(sorted_keys, wanted), len(keys) - 1)
+        ] == wanted
+        edge_block[between_cuts[owner[found]]] = blocks[found]
+
+    if selected is not None:
+        is_selected = np.zeros(len(sizes), dtype=bool)
+        is_selected[np.asarray(selected, dtype=np.int64)] = True
+        kept = is_selected[edge_block]
+        u, v, edge_block = u[kept], v[kept], edge_block[kept]
+    else:
+        is_selected = np.ones(len(sizes), dtype=bool)
+
+    # position of every (block, vertex) copy in the disjoint union of the
+    # selected blocks
+    copied = is_selected[labels]
+    position = np.cumsum(copied) - 1
+    copies = position[order[np.searchsorted(sorted_keys, edge_block * n + u)]]
+    copies_v = position[order[np.searchsorted(sorted_keys, edge_block * n + v)]]
+    union = CSRGraph.from_edges(int(copied.sum()), copies, copies_v)
+    vertices = vertices[copied]
+    union_labels = (np.cumsum(is_selected) - 1)[labels[copied]]
+    parts = union.split(union_labels)
+    current_recorder().count("subgraph_builds", len(parts))
+    return [(vertices[block], subgraph) for block, subgraph in parts]
+
+
+def bfs_order(
+    csr: CSRGraph, root: int, visited: Optional[bytearray] = None
+) -> List[int]:
+    """Vertices reachable from ``root`` in breadth first order.
+
+    Args:
+        csr: Graph to traverse.
+        root: First vertex of the order.
+        visited: Optional mask of vertices the search must not enter. It is
+            updated in place, so a single mask can be shared by several
+            searches over disjoint parts of the graph.
+
+    Returns:
+        List of vertices, every vertex after ``root`` has a neighbor
+        (its parent in the BFS tree) earlier in the list.
+    """
+    indptr = memoryview(csr.indptr)
+    indices = memoryview(csr.indices)
+    if visited is None:
+        visited = bytearray(csr.number_of_nodes())
+
+    visited[root] = True
+    order = [root]
+    queue = deque(order)
+    while queue:
+        v = queue.popleft()
+        for w in indices[indptr[v] : indptr[v + 1]]:
+            if not visited[w]:
+                visited[w] = True
+                order.append(w)
+                queue.append(w)
+    return order
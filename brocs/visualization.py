@@ -1,5 +1,5 @@
 from colorsys import hls_to_rgb
-from typing import List
+from typing import List, Sequence
 
 import matplotlib.pyplot as plt
 import networkx as nx
@@ -29,7 +29,9 @@ def show_graph(graph: nx.Graph, figsize: tuple = (10, 10)):
     plt.close(fig)
 
 
-def show_colored_graph(graph: nx.Graph, coloring: List[int], figsize: tuple = (10, 10)):
+def show_colored_graph(
+    graph: nx.Graph, coloring: Sequence[int], figsize: tuple = (10, 10)
+):
     check_graph(graph)
 
     fig, ax = plt.subplots(figsize=figsize)
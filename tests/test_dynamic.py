@@ -0,0 +1,139 @@
+"""Behavior of ``DynamicColoring`` under edits."""
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from brocs.dynamic import DynamicColoring
+
+
+def assert_consistent(dynamic: DynamicColoring) -> None:
+    """Coloring is proper, no color is larger than the degree of its
+    vertex, and the counts match the colors.
+    """
+    graph = dynamic.to_csr()
+    colors = dynamic.coloring()
+    is_live = np.array([dynamic.has_vertex(v) for v in range(len(colors))])
+    assert (colors[~is_live] == -1).all()
+    assert (colors[is_live] >= 0).all()
+    assert (colors[is_live] <= graph.degrees[is_live]).all()
+    edges = graph.edges()
+    assert not (colors[edges[:, 0]] == colors[edges[:, 1]]).any()
+
+    counts = np.bincount(colors[is_live], minlength=len(dynamic.color_counts))
+    assert (counts == dynamic.color_counts).all()
+    assert dynamic.number_of_colors == np.count_nonzero(counts)
+    assert dynamic.number_of_nodes() == np.count_nonzero(is_live)
+
+
+def test_initial_coloring():
+    dynamic = DynamicColoring(nx.petersen_graph())
+    assert_consistent(dynamic)
+    assert dynamic.number_of_nodes() == 10
+    assert dynamic.number_of_colors == 3
+
+
+def test_empty_graph():
+    dynamic = DynamicColoring()
+    assert dynamic.number_of_nodes() == 0
+    assert dynamic.number_of_colors == 0
+    assert dynamic.add_vertex() == 0
+    assert dynamic.color_of(0) == 0
+
+
+def test_add_edge_between_same_colors_recolors_one_end():
+    dynamic = DynamicColoring(nx.empty_graph(3))
+    assert dynamic.number_of_colors == 1
+    dynamic.add_edge(0, 1)
+    assert dynamic.color_of(0) != dynamic.color_of(1)
+    assert dynamic.number_of_colors == 2
+    assert_consistent(dynamic)
+
+
+def test_deleting_edges_compacts_colors():
+    dynamic = DynamicColoring(nx.complete_graph(4))
+    assert dynamic.number_of_colors == 4
+    for u, v in list(nx.complete_graph(4).edges()):
+        dynamic.remove_edge(u, v)
+        assert_consistent(dynamic)
+    assert dynamic.number_of_colors == 1
+    assert dynamic.color_counts.tolist()[0] == 4
+
+
+def test_remove_vertex():
+    dynamic = DynamicColoring(nx.star_graph(3))
+    dynamic.remove_vertex(0)
+    assert not dynamic.has_vertex(0)
+    assert dynamic.color_of(1) == 0
+    assert dynamic.number_of_colors == 1
+    assert dynamic.coloring()[0] == -1
+    assert_consistent(dynamic)
+
+
+def test_kempe_chain_swap_avoids_a_new_color():
+    # a - b and c - d, both colored 0 - 1, then v joined to a and d
+    dynamic = DynamicColoring()
+    a = dynamic.add_vertex()
+    b = dynamic.add_vertex([a])
+    c = dynamic.add_vertex()
+    d = dynamic.add_vertex([c])
+    assert [dynamic.color_of(x) for x in (a, b, c, d)] == [0, 1, 0, 1]
+
+    v = dynamic.add_vertex([a, d])
+    assert dynamic.number_of_colors == 2
+    assert (dynamic.color_of(a), dynamic.color_of(b)) == (1, 0)
+    assert dynamic.color_of(v) == 0
+    assert_consistent(dynamic)
+
+
+def test_kempe_chain_limit():
+    dynamic = DynamicColoring(kempe_chain_limit=1)
+    a = dynamic.add_vertex()
+    dynamic.add_vertex([a])
+    c = dynamic.add_vertex()
+    d = dynamic.add_vertex([c])
+
+    # the chain of a is too long, v takes a new color
+    v = dynamic.add_vertex([a, d])
+    assert dynamic.color_of(v) == 2
+    assert dynamic.number_of_colors == 3
+    assert_consistent(dynamic)
+
+
+def test_invalid_edits():
+    dynamic = DynamicColoring(nx.path_graph(3))
+    with pytest.raises(ValueError):
+        dynamic.add_edge(0, 0)
+    with pytest.raises(ValueError):
+        dynamic.add_edge(0, 5)
+    with pytest.raises(ValueError):
+        dynamic.remove_edge(0, 2)
+    dynamic.remove_vertex(1)
+    with pytest.raises(ValueError):
+        dynamic.color_of(1)
+    with pytest.raises(ValueError):
+        dynamic.add_vertex([1])
+
+
+@pytest.mark.parametrize("limit", [0, 4, 256])
+def test_random_edits(limit):
+    rng = random.Random(limit)
+    dynamic = DynamicColoring(
+        nx.gnp_random_graph(30, 0.15, seed=limit), kempe_chain_limit=limit
+    )
+    for _ in range(500):
+        live = [v for v in range(len(dynamic.coloring())) if dynamic.has_vertex(v)]
+        edit = rng.random()
+        if edit < 0.4 and len(live) > 1:
+            dynamic.add_edge(*rng.sample(live, 2))
+        elif edit < 0.75:
+            edges = dynamic.to_csr().edges()
+            if len(edges):
+                dynamic.remove_edge(*edges[rng.randrange(len(edges))].tolist())
+        elif edit < 0.9:
+            dynamic.add_vertex(rng.sample(live, min(len(live), 3)))
+        elif live:
+            dynamic.remove_vertex(rng.choice(live))
+        assert_consistent(dynamic)
@@ -0,0 +1,22 @@
+"""Every algorithm colors every graph of ``graph_files`` properly."""
+
+from pathlib import Path
+
+import pytest
+
+from brocs.helpers import delta, validate_coloring
+from brocs.main import ALGORITHMS, load_graph_from_file
+
+GRAPH_FILES = sorted((Path(__file__).parents[1] / "graph_files").glob("*.npy"))
+SEEDS = range(30)
+
+
+@pytest.mark.parametrize("name", ALGORITHMS)
+@pytest.mark.parametrize("file", GRAPH_FILES, ids=lambda file: file.stem)
+def test_algorithm_colors_graph_file(name, file):
+    graph = load_graph_from_file(file, mmap=True)
+    for seed in SEEDS:
+        colors = ALGORITHMS[name](random_state=seed).color_graph(graph)
+        assert validate_coloring(graph, colors), f"seed {seed}"
+        assert colors.min() >= 0, f"seed {seed}"
+        assert colors.max() <= delta(graph), f"seed {seed}"
@@ -0,0 +1,117 @@
+"""Parsing of DIMACS .col files and edge lists."""
+
+import pytest
+
+from brocs.loader import load_dimacs, load_edge_list
+
+# small enough to cut every file of these tests into many chunks
+SMALL_CHUNK = 4
+
+
+def write(tmp_path, name, text):
+    file = tmp_path / name
+    file.write_bytes(text)
+    return file
+
+
+def edge_set(graph):
+    return {tuple(edge) for edge in graph.edges().tolist()}
+
+
+DIMACS = b"""c a comment
+c another one
+p edge 4 3
+
+e 1 2
+e 2 3
+e 3 4
+"""
+
+
+@pytest.mark.parametrize("chunk_bytes", [SMALL_CHUNK, 1 << 20])
+def test_dimacs(tmp_path, chunk_bytes):
+    graph = load_dimacs(write(tmp_path, "g.col", DIMACS), chunk_bytes)
+    assert graph.number_of_nodes() == 4
+    assert edge_set(graph) == {(0, 1), (1, 2), (2, 3)}
+
+
+def test_dimacs_crlf(tmp_path):
+    text = DIMACS.replace(b"\n", b"\r\n")
+    graph = load_dimacs(write(tmp_path, "g.col", text), SMALL_CHUNK)
+    assert graph.number_of_nodes() == 4
+    assert edge_set(graph) == {(0, 1), (1, 2), (2, 3)}
+
+
+def test_dimacs_isolated_vertices_from_problem_line(tmp_path):
+    graph = load_dimacs(write(tmp_path, "g.col", b"p edge 6 1\ne 1 2\n"))
+    assert graph.number_of_nodes() == 6
+    assert graph.number_of_edges() == 1
+
+
+def test_dimacs_edge_lines_with_leading_blanks(tmp_path):
+    text = b"p edge 3 2\n e 1 2\n\te 2 3\n"
+    for chunk_bytes in (SMALL_CHUNK, 1 << 20):
+        graph = load_dimacs(write(tmp_path, "g.col", text), chunk_bytes)
+        assert edge_set(graph) == {(0, 1), (1, 2)}
+
+
+@pytest.mark.parametrize("text", [b"p edge 2 1\ne 1 3\n", b"p edge 2 1\ne 0 1\n"])
+def test_dimacs_vertices_out_of_range(tmp_path, text):
+    with pytest.raises(ValueError):
+        load_dimacs(write(tmp_path, "g.col", text))
+
+
+def test_dimacs_malformed_edge_line(tmp_path):
+    with pytest.raises(ValueError):
+        load_dimacs(write(tmp_path, "g.col", b"p edge 3 2\ne 1 2 3\ne 2 3\n"))
+
+
+EDGE_LIST = b"""# a comment
+% another one
+10 20
+
+20 30
+30 10
+"""
+
+
+@pytest.mark.parametrize("chunk_bytes", [SMALL_CHUNK, 1 << 20])
+def test_edge_list(tmp_path, chunk_bytes):
+    graph = load_edge_list(write(tmp_path, "g.edges", EDGE_LIST), chunk_bytes)
+    assert graph.number_of_nodes() == 3
+    assert edge_set(graph) == {(0, 1), (1, 2), (0, 2)}
+
+
+def test_edge_list_crlf(tmp_path):
+    text = EDGE_LIST.replace(b"\n", b"\r\n")
+    graph = load_edge_list(write(tmp_path, "g.edges", text), SMALL_CHUNK)
+    assert edge_set(graph) == {(0, 1), (1, 2), (0, 2)}
+
+
+def test_edge_list_weights(tmp_path):
+    text = b"1 2 0.5\n2 3 1.5\n"
+    graph = load_edge_list(write(tmp_path, "g.edges", text), SMALL_CHUNK)
+    assert edge_set(graph) == {(0, 1), (1, 2)}
+
+
+def test_edge_list_ids_are_compacted(tmp_path):
+    graph = load_edge_list(write(tmp_path, "g.edges", b"-5 1000000\n1000000 7\n"))
+    assert graph.number_of_nodes() == 3
+    assert edge_set(graph) == {(0, 2), (1, 2)}
+
+
+@pytest.mark.parametrize("chunk_bytes", [SMALL_CHUNK, 1 << 20])
+def test_edge_list_lines_of_different_length(tmp_path, chunk_bytes):
+    text = b"1 2 9\n3 4\n5 6\n7 8\n"
+    with pytest.raises(ValueError):
+        load_edge_list(write(tmp_path, "g.edges", text), chunk_bytes)
+
+
+def test_edge_list_single_column(tmp_path):
+    with pytest.raises(ValueError):
+        load_edge_list(write(tmp_path, "g.edges", b"1\n2\n"))
+
+
+def test_empty_edge_list(tmp_path):
+    graph = load_edge_list(write(tmp_path, "g.edges", b"# nothing\n\n"))
+    assert graph.number_of_nodes() == 0